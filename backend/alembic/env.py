@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from alembic import context
 from app.core.config import settings
 from app.core.database import Base
+import app.core.models  # noqa: F401
 import app.modules.auth.models  # noqa: F401
 import app.modules.domains.models  # noqa: F401
 import app.modules.topics.models   # noqa: F401
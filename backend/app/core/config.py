@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,11 +6,26 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     DATABASE_URL: str
+    # Connection pool (per worker process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Sign role + security epoch into access tokens so require_role skips the DB
+    ACCESS_TOKEN_ROLE_CLAIMS: bool = False
+    SECURITY_EPOCH_REFRESH_SECONDS: float = 30.0
     CORS_ORIGINS: str = ""
 
+    # Server process (python -m app.server). Each worker has its own DB pool.
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_CONCURRENCY: int = 1
+
     # SMTP — optional, required for email sending
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
@@ -19,10 +35,72 @@ class Settings(BaseSettings):
     # Domain used to build per-user SMTP auth address, e.g. "renr.grupoepi.es"
     # Result: pespinosa@prensaiberica.es → pespinosa@renr.grupoepi.es
     SMTP_AUTH_DOMAIN: str = ""
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT_SECONDS: float = 15.0
+    # Authenticated sessions kept open per auth user between sends
+    SMTP_POOL_MAX_IDLE: int = 2
+    SMTP_POOL_IDLE_SECONDS: float = 300.0
+    SMTP_POOL_KEEPALIVE_SECONDS: float = 60.0
+    # Outbox worker (one per API process) delivering queued topic emails
+    OUTBOX_CONCURRENCY: int = 2
+    OUTBOX_MAX_ATTEMPTS: int = 6
+    OUTBOX_RETRY_BASE_SECONDS: float = 30.0
+    OUTBOX_POLL_SECONDS: float = 10.0
+    OUTBOX_LEASE_SECONDS: float = 120.0
+
+    # Editors' local day: auto topics are added once per day in this zone
+    TOPICS_TIMEZONE: str = "Europe/Madrid"
+
+    # Sent topics older than the horizon move to daily_topics_archive;
+    # ARCHIVE_INTERVAL_SECONDS=0 disables the in-process schedule
+    ARCHIVE_HORIZON_DAYS: int = 90
+    ARCHIVE_INTERVAL_SECONDS: float = 6 * 3600
+    # Each batch holds the daily_topics change-counter lock that topic writes wait on
+    ARCHIVE_BATCH_SIZE: int = 300
+    # Tombstones of deleted/archived topics (GET /api/topics/changes) are kept
+    # this long; clients that last synced earlier reload the full list
+    TOMBSTONE_RETENTION_DAYS: int = 30
+
+    # Duplicate check: drafts plus topics created in the last N days; titles
+    # match at this pg_trgm similarity or above (0.3 minimum, the index cut-off)
+    DUPLICATE_WINDOW_DAYS: int = 30
+    DUPLICATE_SIMILARITY_THRESHOLD: float = 0.5
+
+    # Hot-topics / competitors feeds from the static host, polled with
+    # conditional requests every N seconds by one API process (0 disables).
+    # Any HTTP server (python -m http.server) can stand in for the host.
+    HOT_TOPICS_FEED_URL: str = (
+        "https://estaticos-data.prensaiberica.es/statics/data/content/json/hot_topics/last_screenshot.json"
+    )
+    COMPETITORS_FEED_URL: str = (
+        "https://estaticos-data.prensaiberica.es/statics/data/content/json/hot_topics/competitors.json"
+    )
+    FEEDS_INTERVAL_SECONDS: float = 300.0
+    FEEDS_TIMEOUT_SECONDS: float = 15.0
+
+    # Live change feed (SSE): comment line sent to idle streams every N
+    # seconds; a subscriber with more pending events is told to resync instead
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    EVENTS_QUEUE_SIZE: int = 100
 
     # Sports events — API key used by n8n to POST daily sport events
     SPORTS_API_KEY: str = ""
 
+    # Optional X-Api-Key required to scrape /api/metrics
+    METRICS_API_KEY: str = ""
+
+    # Development/test: enforce @query_budget declarations and a per-request
+    # statement budget; relationships also raise on lazy load when enabled.
+    QUERY_BUDGET_MODE: Literal["off", "warn", "raise"] = "off"
+    QUERY_BUDGET_PER_REQUEST: int = 20
+
+    # Authenticated-user cache (per process). TTL bounds staleness across workers.
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 1024
+
+    # bcrypt runs on a dedicated thread pool of this size, off the event loop
+    PASSWORD_HASH_WORKERS: int = 2
+
     @property
     def cors_origins_list(self) -> list[str]:
         return [o.strip() for o in self.CORS_ORIGINS.split(",") if o.strip()]
@@ -2,7 +2,7 @@ import asyncio
 import argparse
 from sqlalchemy import select
 from app.core.database import AsyncSessionLocal
-from app.core.security import hash_password
+from app.core.security import hash_password_async
 from app.modules.auth.models import User, Role
 
 
@@ -19,7 +19,7 @@ async def create_user(email: str, password: str, role_name: str) -> None:
             print(f"Error: el usuario '{email}' ya existe.")
             return
 
-        db.add(User(email=email, hashed_password=hash_password(password), role_id=role.id))
+        db.add(User(email=email, hashed_password=await hash_password_async(password), role_id=role.id))
         await db.commit()
         print(f"Usuario '{email}' creado con rol '{role_name}'.")
 
@@ -1,10 +1,89 @@
+import time
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.connects = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.total_wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+
+pool_stats = PoolStats()
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def connect(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        if self._overflow > overflow_before and self._overflow > 0:
+            pool_stats.overflow_events += 1
+        return conn
+
+
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    poolclass=MeteredQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Loader strategy for every relationship(); with query budgets enabled an
+# accidental lazy load raises instead of silently issuing SQL.
+RELATIONSHIP_LAZY = "select" if settings.QUERY_BUDGET_MODE == "off" else "raise_on_sql"
+
+
+@event.listens_for(engine.sync_engine.pool, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.connects += 1
+
+
+def pool_status() -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "connects": pool_stats.connects,
+        "checkouts": pool_stats.checkouts,
+        "overflow_events": pool_stats.overflow_events,
+        "timeouts": pool_stats.timeouts,
+        "avg_wait_ms": (
+            round(pool_stats.total_wait_seconds / pool_stats.checkouts * 1000, 3)
+            if pool_stats.checkouts else 0.0
+        ),
+        "max_wait_ms": round(pool_stats.max_wait_seconds * 1000, 3),
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
+
 
 class Base(DeclarativeBase):
     pass
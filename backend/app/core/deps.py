@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,7 +7,9 @@ from sqlalchemy.orm import selectinload
 import jwt
 
 from app.core.database import AsyncSessionLocal
-from app.core.security import decode_token
+from app.core.epochs import epoch_table
+from app.core.security import decode_token, decode_token_claims
+from app.core.user_cache import CachedUser, user_cache
 
 bearer_scheme = HTTPBearer()
 
@@ -27,17 +30,54 @@ async def get_current_user(
     except (jwt.PyJWTError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     result = await db.execute(
         select(User).where(User.id == user_id).options(selectinload(User.role))
     )
     user = result.scalar_one_or_none()
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+    snapshot = CachedUser.from_orm_user(user)
+    user_cache.put(snapshot)
+    return snapshot
+
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    id: int
+    role_name: str
 
 
 def require_role(*roles: str):
-    async def checker(current_user=Depends(get_current_user)):
+    """Authorize by role.
+
+    Tokens carrying a role claim whose security epoch is still current are
+    authorized without loading the user and a TokenPrincipal is returned;
+    otherwise the full user from get_current_user is returned. Callers should
+    only rely on `.id`.
+    """
+    async def checker(
+        credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+        db: AsyncSession = Depends(get_db),
+    ):
+        try:
+            claims = decode_token_claims(credentials.credentials)
+            user_id = int(claims["sub"])
+        except (jwt.PyJWTError, KeyError, ValueError):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+        role, epoch = claims.get("role"), claims.get("sep")
+        if role is not None and epoch is not None and await epoch_table.get(user_id, db) == epoch:
+            if role not in roles:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions"
+                )
+            return TokenPrincipal(id=user_id, role_name=role)
+
+        current_user = await get_current_user(credentials, db)
         if current_user.role.name not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions"
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+
+class SecurityEpochTable:
+    """In-memory map of active user id -> security epoch.
+
+    Role-carrying tokens are only trusted while their epoch matches this table.
+    users.service updates it in place after a role change or deactivation; the
+    periodic reload picks up changes made by other worker processes.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._epochs: dict[int, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    async def _reload(self, db: AsyncSession) -> None:
+        from app.modules.auth.models import User
+
+        async with self._lock:
+            if not self._is_stale():
+                return
+            result = await db.execute(
+                select(User.id, User.security_epoch).where(User.is_active == True)
+            )
+            self._epochs = dict(result.all())
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+
+    async def get(self, user_id: int, db: AsyncSession) -> Optional[int]:
+        if self._is_stale():
+            await self._reload(db)
+        return self._epochs.get(user_id)
+
+    def set(self, user_id: int, epoch: int) -> None:
+        self._epochs[user_id] = epoch
+
+    def discard(self, user_id: int) -> None:
+        self._epochs.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {"users": len(self._epochs), "reloads": self.reloads}
+
+
+epoch_table = SecurityEpochTable(settings.SECURITY_EPOCH_REFRESH_SECONDS)
@@ -0,0 +1,75 @@
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models import ChangeCounter
+
+CACHE_CONTROL = "private, no-cache"
+
+# group -> (version, serialized body); only the latest version is kept
+_bodies: dict[str, tuple[int, bytes]] = {}
+_adapters: dict[type, TypeAdapter] = {}
+
+
+async def bump_version(db: AsyncSession, *groups: str) -> dict[str, int]:
+    """Increment the change counter of each group inside the caller's transaction.
+
+    Returns the new versions. The counter rows stay locked until the caller
+    commits, so versions of one group become visible in increasing order.
+    """
+    stmt = insert(ChangeCounter).values([{"name": g, "version": 1} for g in groups])
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ChangeCounter.name],
+            set_={"version": ChangeCounter.version + 1},
+        ).returning(ChangeCounter.name, ChangeCounter.version)
+    )
+    return dict(result.all())
+
+
+async def get_version(db: AsyncSession, group: str) -> int:
+    version = await db.scalar(select(ChangeCounter.version).where(ChangeCounter.name == group))
+    return version or 0
+
+
+async def get_versions(db: AsyncSession, *groups: str) -> dict[str, int]:
+    result = await db.execute(
+        select(ChangeCounter.name, ChangeCounter.version).where(ChangeCounter.name.in_(groups))
+    )
+    versions = dict(result.all())
+    return {g: versions.get(g, 0) for g in groups}
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def conditional_list(request: Request, db: AsyncSession, group: str, loader, schema) -> Response:
+    """Serve a reference-data list with a version-stamped ETag.
+
+    A matching If-None-Match is answered with 304 after a single counter
+    lookup; otherwise the serialized body is reused while the version holds.
+    """
+    version = await get_version(db, group)
+    etag = f'W/"{group}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = _bodies.get(group)
+    if cached is not None and cached[0] == version:
+        body = cached[1]
+    else:
+        adapter = _adapters.get(schema)
+        if adapter is None:
+            adapter = _adapters[schema] = TypeAdapter(list[schema])
+        items = await loader(db)
+        body = adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+        _bodies[group] = (version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,190 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class MetricsRegistry:
+    """Per-process request and database metrics in Prometheus text format."""
+
+    def __init__(self):
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.statements: dict[tuple[str, str], Histogram] = {}
+        self.db_seconds: dict[tuple[str, str], float] = {}
+        self.responses: dict[tuple[str, str, int], int] = {}
+        self.in_flight = 0
+        self.sql_statements_total = 0
+        self.sql_seconds_total = 0.0
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route)
+        if key not in self.latency:
+            self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.statements[key] = Histogram(STATEMENT_BUCKETS)
+            self.db_seconds[key] = 0.0
+        self.latency[key].observe(seconds)
+        self.statements[key].observe(stats.statements)
+        self.db_seconds[key] += stats.db_seconds
+        status_key = (method, route, status)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def observe_statement(self, seconds: float) -> None:
+        self.sql_statements_total += 1
+        self.sql_seconds_total += seconds
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += seconds
+
+    def render(self, gauges: Optional[dict[str, dict]] = None) -> str:
+        lines: list[str] = []
+        _render_histograms(lines, "http_request_duration_seconds", "Request latency by route.", self.latency)
+        _render_histograms(lines, "http_request_sql_statements", "SQL statements executed per request.", self.statements)
+
+        lines.append("# HELP http_request_db_seconds_total Time spent in the database by route.")
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        for (method, route), value in sorted(self.db_seconds.items()):
+            lines.append(f'http_request_db_seconds_total{{method="{method}",route="{_escape(route)}"}} {value:.6f}')
+
+        lines.append("# HELP http_responses_total Responses by route and status code.")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route, status), value in sorted(self.responses.items()):
+            lines.append(
+                f'http_responses_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {value}'
+            )
+
+        lines.append("# HELP http_requests_in_flight Requests currently being served.")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        lines.append("# HELP sql_statements_total SQL statements executed by this process.")
+        lines.append("# TYPE sql_statements_total counter")
+        lines.append(f"sql_statements_total {self.sql_statements_total}")
+        lines.append("# HELP sql_seconds_total Time spent executing SQL statements.")
+        lines.append("# TYPE sql_seconds_total counter")
+        lines.append(f"sql_seconds_total {self.sql_seconds_total:.6f}")
+
+        for prefix, values in (gauges or {}).items():
+            for name, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _render_histograms(lines: list[str], name: str, help_text: str, histograms: dict) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), hist in sorted(histograms.items()):
+        labels = f'method="{method}",route="{_escape(route)}"'
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+
+metrics = MetricsRegistry()
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = getattr(route, "path_format", None) or getattr(route, "path", "")
+    # Routes from included routers may carry only the router-local path;
+    # rebuild the prefix from the concrete request path.
+    rendered = template
+    for key, value in scope.get("path_params", {}).items():
+        rendered = rendered.replace("{" + key + "}", str(value))
+    path = scope.get("path", "")
+    if rendered and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + template
+    return template
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            current_request_stats.reset(token)
+            metrics.observe_request(
+                scope["method"], _route_template(scope), status_code, time.perf_counter() - start, stats
+            )
+
+
+def instrument_engine(engine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            metrics.observe_statement(time.perf_counter() - starts.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_query_start"):
+            conn.info["metrics_query_start"].pop()
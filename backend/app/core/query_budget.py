@@ -0,0 +1,122 @@
+import functools
+import json
+import logging
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import current_request_stats
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class _Scope:
+    __slots__ = ("name", "budget", "statements")
+
+    def __init__(self, name: str, budget: int):
+        self.name = name
+        self.budget = budget
+        self.statements = 0
+
+
+_active_scopes: ContextVar[tuple] = ContextVar("query_budget_scopes", default=())
+
+
+def _enabled() -> bool:
+    return settings.QUERY_BUDGET_MODE != "off"
+
+
+def _report(message: str) -> None:
+    if settings.QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def query_budget(max_statements: int):
+    """Declare the maximum SQL statements an async service function may run.
+
+    Only enforced when QUERY_BUDGET_MODE is "warn" or "raise"; otherwise the
+    function is returned unwrapped.
+    """
+    def decorator(fn):
+        if not _enabled():
+            return fn
+
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            scope = _Scope(name, max_statements)
+            token = _active_scopes.set(_active_scopes.get() + (scope,))
+            try:
+                result = await fn(*args, **kwargs)
+            finally:
+                _active_scopes.reset(token)
+            if scope.statements > scope.budget:
+                _report(f"Query budget exceeded in {name}: {scope.statements} > {scope.budget} statements")
+            return result
+        return wrapper
+    return decorator
+
+
+def install(engine) -> None:
+    if not _enabled():
+        return
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        for scope in _active_scopes.get():
+            scope.statements += 1
+
+
+class QueryBudgetMiddleware:
+    """Checks the per-request statement count gathered by MetricsMiddleware.
+
+    Must be installed inside MetricsMiddleware. In "raise" mode the response is
+    replaced by a 500 before it starts.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled():
+            await self.app(scope, receive, send)
+            return
+
+        budget = settings.QUERY_BUDGET_PER_REQUEST
+        suppressed = False
+
+        async def send_wrapper(message):
+            nonlocal suppressed
+            if suppressed:
+                return
+            if message["type"] == "http.response.start":
+                stats = current_request_stats.get()
+                if stats is not None and stats.statements > budget:
+                    detail = (
+                        f"Query budget exceeded for {scope['method']} {scope['path']}: "
+                        f"{stats.statements} > {budget} statements"
+                    )
+                    logger.warning(detail)
+                    if settings.QUERY_BUDGET_MODE == "raise":
+                        suppressed = True
+                        body = json.dumps({"detail": detail}).encode()
+                        await send({
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [
+                                (b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                            ],
+                        })
+                        await send({"type": "http.response.body", "body": body})
+                        return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
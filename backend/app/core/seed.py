@@ -1,21 +1,82 @@
+import hashlib
+import json
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+from app.core.etag import bump_version
+from app.core.models import SeedState
 from app.modules.auth.models import Role
 from app.modules.domains.models import Category
+from app.modules.domains import service as domains_service
+from app.modules.topics import service as topics_service
+from app.modules.topics.service import (
+    AUTO_TOPICS_DEFAULT, FIXED_CATEGORIES, seed_auto_topics, seed_fixed_categories,
+)
+from app.modules.users.service import ETAG_ROLES
 
 ROLES = ["admin", "responsable", "usuario"]
 CATEGORIES = ["nacionales", "regionales", "deportivos", "verticales", "revistas"]
 
+SEED_KEY = "default"
+# pg_advisory_xact_lock key serializing seeding across worker processes
+SEED_LOCK_ID = 0x5EED
+
+
+def seed_fingerprint() -> str:
+    payload = json.dumps(
+        {
+            "roles": ROLES,
+            "categories": CATEGORIES,
+            "topic_categories": FIXED_CATEGORIES,
+            "auto_topics": AUTO_TOPICS_DEFAULT,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
 
 async def seed_roles(db: AsyncSession) -> None:
-    for name in ROLES:
-        result = await db.execute(select(Role).where(Role.name == name))
-        if not result.scalar_one_or_none():
-            db.add(Role(name=name))
+    await db.execute(
+        insert(Role).values([{"name": name} for name in ROLES]).on_conflict_do_nothing(index_elements=["name"])
+    )
+    await db.execute(
+        insert(Category)
+        .values([{"name": name} for name in CATEGORIES])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+
+
+async def seed_all(db: AsyncSession) -> bool:
+    """Apply all seed data unless the stored fingerprint already matches.
+
+    Returns True when the seeders ran. With unchanged seed data startup costs a
+    single primary-key lookup. Otherwise workers starting together serialize on
+    an advisory lock and only the first one applies the seed.
+    """
+    fingerprint = seed_fingerprint()
+    stmt = select(SeedState.fingerprint).where(SeedState.key == SEED_KEY)
+    if await db.scalar(stmt) == fingerprint:
+        return False
 
-    for name in CATEGORIES:
-        result = await db.execute(select(Category).where(Category.name == name))
-        if not result.scalar_one_or_none():
-            db.add(Category(name=name))
+    await db.execute(select(func.pg_advisory_xact_lock(SEED_LOCK_ID)))
+    if await db.scalar(stmt) == fingerprint:
+        await db.rollback()
+        return False
 
+    await seed_roles(db)
+    await seed_fixed_categories(db)
+    await seed_auto_topics(db)
+    await bump_version(
+        db, ETAG_ROLES, domains_service.ETAG_CATEGORIES,
+        topics_service.ETAG_CATEGORIES, topics_service.ETAG_AUTO_TOPICS,
+    )
+    stmt = insert(SeedState).values(key=SEED_KEY, fingerprint=fingerprint)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SeedState.key],
+            set_={"fingerprint": stmt.excluded.fingerprint, "applied_at": func.now()},
+        )
+    )
     await db.commit()
+    return True
@@ -0,0 +1,115 @@
+import datetime
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CachedRole:
+    id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Read-only snapshot of an authenticated user and its role."""
+
+    id: int
+    email: str
+    smtp_password: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    avatar: Optional[str]
+    is_active: bool
+    role_id: int
+    role: CachedRole
+    created_at: datetime.datetime
+
+    @property
+    def has_smtp_password(self) -> bool:
+        return bool(self.smtp_password)
+
+    @classmethod
+    def from_orm_user(cls, user) -> "CachedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            smtp_password=user.smtp_password,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            avatar=user.avatar,
+            is_active=user.is_active,
+            role_id=user.role_id,
+            role=CachedRole(id=user.role.id, name=user.role.name),
+            created_at=user.created_at,
+        )
+
+
+class UserCache:
+    """Bounded LRU of user snapshots with a per-entry TTL.
+
+    The cache is per process: users.service invalidates entries explicitly,
+    and the TTL bounds how long another worker may serve a stale snapshot.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[float, CachedUser]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def put(self, user: CachedUser) -> None:
+        if not self.enabled:
+            return
+        self._entries[user.id] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+user_cache = UserCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
@@ -1,25 +1,52 @@
+import logging
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from app.core.config import settings
-from app.core.database import AsyncSessionLocal
-from app.core.seed import seed_roles
-from app.modules.topics.service import seed_fixed_categories, seed_auto_topics
+from app.core.database import AsyncSessionLocal, engine, pool_status
+from app.core.deps import require_role
+from app.core.epochs import epoch_table
+from app.core.metrics import MetricsMiddleware, instrument_engine, metrics
+from app.core import query_budget
+from app.core.security import password_hasher
+from app.core.user_cache import user_cache
+from app.core.seed import seed_all
 from app.modules.auth.router import router as auth_router
 from app.modules.users.router import router as users_router
 from app.modules.domains.router import router as domains_router
 from app.modules.topics.router import router as topics_router
+from app.modules.topics.archive import archive_scheduler
+from app.modules.topics.events import change_feed
+from app.modules.topics.feeds import feed_ingester
+from app.modules.topics.outbox import outbox_worker
+from app.modules.topics.smtp_pool import smtp_pool
 from app.modules.sports.router import router as sports_router
 
 
+logger = logging.getLogger("uvicorn.error")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    start = time.perf_counter()
     async with AsyncSessionLocal() as db:
-        await seed_roles(db)
-        await seed_fixed_categories(db)
-        await seed_auto_topics(db)
+        seeded = await seed_all(db)
+    seed_ms = round((time.perf_counter() - start) * 1000, 1)
+    app.state.startup = {"seed_ms": seed_ms, "seeded": seeded}
+    logger.info("Startup seeding took %.1f ms (seeded=%s)", seed_ms, seeded)
+    outbox_worker.start()
+    archive_scheduler.start()
+    change_feed.start()
+    feed_ingester.start()
     yield
+    await feed_ingester.stop()
+    await change_feed.stop()
+    await archive_scheduler.stop()
+    await outbox_worker.stop()
+    await smtp_pool.close()
 
 
 app = FastAPI(
@@ -30,6 +57,11 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+instrument_engine(engine)
+query_budget.install(engine)
+app.add_middleware(query_budget.QueryBudgetMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 _origins = settings.cors_origins_list
 app.add_middleware(
     CORSMiddleware,
@@ -37,6 +69,7 @@ app.add_middleware(
     allow_credentials="*" not in _origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
@@ -48,6 +81,39 @@ app.include_router(sports_router, prefix="/api/sports", tags=["sports"])
 
 @app.get("/api/health", tags=["system"])
 async def health():
-    async with AsyncSessionLocal() as db:
-        await db.execute(text("SELECT 1"))
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
     return {"status": "ok"}
+
+
+@app.get("/api/health/stats", tags=["system"])
+async def health_stats(_=Depends(require_role("admin"))):
+    return {
+        "startup": getattr(app.state, "startup", None),
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "security_epochs": epoch_table.stats(),
+        "db_pool": pool_status(),
+        "smtp_pool": smtp_pool.stats(),
+        "outbox": outbox_worker.stats(),
+        "archive": archive_scheduler.stats(),
+        "change_feed": change_feed.stats(),
+        "feeds": feed_ingester.stats(),
+    }
+
+
+@app.get("/api/metrics", tags=["system"], response_class=PlainTextResponse)
+async def metrics_exposition(api_key: str = Header(None, alias="X-Api-Key")):
+    if settings.METRICS_API_KEY and api_key != settings.METRICS_API_KEY:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Invalid API key")
+    body = metrics.render({
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "db_pool": pool_status(),
+        "smtp_pool": smtp_pool.stats(),
+        "outbox": outbox_worker.stats(),
+        "archive": archive_scheduler.stats(),
+        "change_feed": change_feed.stats(),
+        "feeds": feed_ingester.stats(),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
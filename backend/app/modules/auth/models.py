@@ -1,9 +1,9 @@
 import datetime
 from typing import Optional
-from sqlalchemy import String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import String, Boolean, ForeignKey, DateTime, Integer, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, RELATIONSHIP_LAZY
 
 
 class Role(Base):
@@ -11,7 +11,9 @@ class Role(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
-    users: Mapped[list["User"]] = relationship("User", back_populates="role")
+    users: Mapped[list["User"]] = relationship(
+        "User", back_populates="role", lazy=RELATIONSHIP_LAZY, passive_deletes=True
+    )
 
 
 class User(Base):
@@ -25,8 +27,10 @@ class User(Base):
     last_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     avatar: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Bumped on role change / deactivation; invalidates role-carrying tokens
+    security_epoch: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     role_id: Mapped[int] = mapped_column(ForeignKey("roles.id"), nullable=False)
-    role: Mapped["Role"] = relationship("Role", back_populates="users")
+    role: Mapped["Role"] = relationship("Role", back_populates="users", lazy=RELATIONSHIP_LAZY)
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.deps import get_db, get_current_user
 from app.core.security import create_access_token
 from app.modules.auth.schemas import LoginRequest, TokenResponse, UserOut
@@ -11,6 +12,10 @@ router = APIRouter()
 @router.post("/login", response_model=TokenResponse)
 async def login(body: LoginRequest, db: AsyncSession = Depends(get_db)):
     user = await authenticate_user(body.email, body.password, db)
+    if settings.ACCESS_TOKEN_ROLE_CLAIMS:
+        return TokenResponse(
+            access_token=create_access_token(user.id, role=user.role.name, epoch=user.security_epoch)
+        )
     return TokenResponse(access_token=create_access_token(user.id))
 
 
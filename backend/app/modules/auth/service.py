@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.modules.auth.models import User
-from app.core.security import verify_password
+from app.core.security import verify_password_async
 
 
 async def authenticate_user(email: str, password: str, db: AsyncSession) -> User:
@@ -11,7 +11,7 @@ async def authenticate_user(email: str, password: str, db: AsyncSession) -> User
         select(User).where(User.email == email).options(selectinload(User.role))
     )
     user = result.scalar_one_or_none()
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password_async(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales incorrectas"
         )
@@ -1,8 +1,9 @@
 import datetime
+from typing import Optional
 from sqlalchemy import String, ForeignKey, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, RELATIONSHIP_LAZY
 
 
 class Category(Base):
@@ -10,7 +11,9 @@ class Category(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
-    domains: Mapped[list["Domain"]] = relationship("Domain", back_populates="category")
+    domains: Mapped[list["Domain"]] = relationship(
+        "Domain", back_populates="category", lazy=RELATIONSHIP_LAZY, passive_deletes=True
+    )
 
 
 class Domain(Base):
@@ -20,8 +23,11 @@ class Domain(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     full_url: Mapped[str] = mapped_column(String(500), nullable=False)
     domain: Mapped[str] = mapped_column(String(255), nullable=False)
+    # site key in the hot-topics/competitors feeds; defaults to the first
+    # label of `domain` (see topics.feeds.site_key)
+    feed_key: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     category_id: Mapped[int] = mapped_column(ForeignKey("domain_categories.id"), nullable=False)
-    category: Mapped["Category"] = relationship("Category", back_populates="domains")
+    category: Mapped["Category"] = relationship("Category", back_populates="domains", lazy=RELATIONSHIP_LAZY)
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
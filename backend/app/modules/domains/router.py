@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_db, get_current_user, require_role
+from app.core.etag import conditional_list
 from app.modules.domains import schemas, service
 
 router = APIRouter()
@@ -11,10 +12,13 @@ router = APIRouter()
 
 @router.get("/categories", response_model=list[schemas.CategoryOut])
 async def list_categories(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    return await service.list_categories(db)
+    return await conditional_list(
+        request, db, service.ETAG_CATEGORIES, service.list_categories, schemas.CategoryOut
+    )
 
 
 @router.post("/categories", response_model=schemas.CategoryOut, status_code=status.HTTP_201_CREATED)
@@ -49,10 +53,13 @@ async def delete_category(
 
 @router.get("/", response_model=list[schemas.DomainOut])
 async def list_domains(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    return await service.list_domains(db)
+    return await conditional_list(
+        request, db, service.ETAG_DOMAINS, service.list_domains, schemas.DomainOut
+    )
 
 
 @router.post("/", response_model=schemas.DomainOut, status_code=status.HTTP_201_CREATED)
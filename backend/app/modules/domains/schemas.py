@@ -18,6 +18,7 @@ class DomainOut(BaseModel):
     name: str
     full_url: str
     domain: str
+    feed_key: Optional[str] = None
     category: CategoryOut
     created_at: datetime.datetime
     model_config = {"from_attributes": True}
@@ -27,6 +28,7 @@ class DomainCreate(BaseModel):
     name: str
     full_url: str
     domain: str
+    feed_key: Optional[str] = None
     category_id: int
 
 
@@ -34,4 +36,5 @@ class DomainUpdate(BaseModel):
     name: Optional[str] = None
     full_url: Optional[str] = None
     domain: Optional[str] = None
+    feed_key: Optional[str] = None
     category_id: Optional[int] = None
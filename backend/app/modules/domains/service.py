@@ -3,12 +3,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+from app.core.etag import bump_version
+from app.core.query_budget import query_budget
 from app.modules.domains.models import Category, Domain
 from app.modules.domains.schemas import CategoryCreate, DomainCreate, DomainUpdate
 
+# change-counter groups behind the ETags of the list endpoints
+ETAG_CATEGORIES = "domain_categories"
+ETAG_DOMAINS = "domains"
+
 
 # ── Categories ──────────────────────────────────────────────
 
+@query_budget(1)
 async def list_categories(db: AsyncSession) -> list[Category]:
     result = await db.execute(select(Category).order_by(Category.name))
     return result.scalars().all()
@@ -20,6 +27,7 @@ async def create_category(data: CategoryCreate, db: AsyncSession) -> Category:
         raise HTTPException(status.HTTP_409_CONFLICT, detail="Categoría ya existe")
     cat = Category(name=data.name)
     db.add(cat)
+    await bump_version(db, ETAG_CATEGORIES)
     await db.commit()
     await db.refresh(cat)
     return cat
@@ -34,6 +42,7 @@ async def update_category(cat_id: int, data: CategoryCreate, db: AsyncSession) -
     if dup.scalar_one_or_none():
         raise HTTPException(status.HTTP_409_CONFLICT, detail="Nombre ya en uso")
     cat.name = data.name
+    await bump_version(db, ETAG_CATEGORIES, ETAG_DOMAINS)
     await db.commit()
     await db.refresh(cat)
     return cat
@@ -48,11 +57,13 @@ async def delete_category(cat_id: int, db: AsyncSession) -> None:
     if has_domains.scalar_one_or_none():
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="La categoría tiene dominios asociados")
     await db.delete(cat)
+    await bump_version(db, ETAG_CATEGORIES)
     await db.commit()
 
 
 # ── Domains ─────────────────────────────────────────────────
 
+@query_budget(2)
 async def list_domains(db: AsyncSession) -> list[Domain]:
     result = await db.execute(
         select(Domain).options(selectinload(Domain.category)).order_by(Domain.name)
@@ -68,9 +79,11 @@ async def create_domain(data: DomainCreate, db: AsyncSession) -> Domain:
         name=data.name,
         full_url=data.full_url,
         domain=data.domain,
+        feed_key=data.feed_key or None,
         category_id=data.category_id,
     )
     db.add(dom)
+    await bump_version(db, ETAG_DOMAINS)
     await db.commit()
     result = await db.execute(
         select(Domain).where(Domain.id == dom.id).options(selectinload(Domain.category))
@@ -92,12 +105,16 @@ async def update_domain(dom_id: int, data: DomainUpdate, db: AsyncSession) -> Do
         dom.full_url = data.full_url
     if data.domain is not None:
         dom.domain = data.domain
+    if data.feed_key is not None:
+        # "" clears the override
+        dom.feed_key = data.feed_key or None
     if data.category_id is not None:
         cat = await db.execute(select(Category).where(Category.id == data.category_id))
         if not cat.scalar_one_or_none():
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
         dom.category_id = data.category_id
 
+    await bump_version(db, ETAG_DOMAINS)
     await db.commit()
     result = await db.execute(
         select(Domain).where(Domain.id == dom_id).options(selectinload(Domain.category))
@@ -111,4 +128,5 @@ async def delete_domain(dom_id: int, db: AsyncSession) -> None:
     if not dom:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Dominio no encontrado")
     await db.delete(dom)
+    await bump_version(db, ETAG_DOMAINS)
     await db.commit()
@@ -0,0 +1,253 @@
+"""Archival of sent topics into daily_topics_archive.
+
+Sent topics older than ARCHIVE_HORIZON_DAYS are moved in batches with one
+DELETE ... RETURNING feeding an INSERT ... SELECT, so a row is never in both
+tables. The archive is range-partitioned by month (UTC); partitions are
+created here before rows land in them. Every API process schedules the job
+every ARCHIVE_INTERVAL_SECONDS, but a run only goes ahead in the process that
+gets the ARCHIVE_RUN_LOCK_ID advisory lock; the others skip that round. Each
+batch holds the daily_topics change-counter lock, which every topic write
+needs, so batches are kept small. Archived topics leave a tombstone for
+delta sync, like deleted ones; the same job prunes tombstones older than
+TOMBSTONE_RETENTION_DAYS.
+
+CLI:
+    python -m app.modules.topics.archive run      # archive now
+    python -m app.modules.topics.archive report   # rows and partitions
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+from sqlalchemy import Integer, cast, delete, func, insert, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.etag import bump_version
+from app.core.models import ChangeCounter
+from app.modules.topics.models import DailyTopic, DailyTopicArchive, DailyTopicTombstone, EmailLogTopic, TopicCategory
+from app.modules.topics.service import ETAG_TOPICS, TOMBSTONES_PRUNED
+
+logger = logging.getLogger("uvicorn.error")
+
+ARCHIVE_LOCK_ID = 0xA2C1  # partition DDL, per transaction
+ARCHIVE_RUN_LOCK_ID = 0xA2C2  # a whole run, per session
+_ARCHIVED_COLUMNS = [
+    "id", "sent_at", "title", "url", "include_url", "observation", "category_id",
+    "original_source", "original_url", "created_at",
+]
+
+
+def _month_start(ts: datetime.datetime) -> datetime.datetime:
+    ts = ts.astimezone(datetime.timezone.utc)
+    return datetime.datetime(ts.year, ts.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def _next_month(month: datetime.datetime) -> datetime.datetime:
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+async def ensure_partitions(db: AsyncSession, start: datetime.datetime, end: datetime.datetime) -> list[str]:
+    """Create the monthly partitions covering [start, end]."""
+    await db.execute(select(func.pg_advisory_xact_lock(ARCHIVE_LOCK_ID)))
+    created = []
+    month = _month_start(start)
+    while month <= end:
+        upper = _next_month(month)
+        name = f"{DailyTopicArchive.__tablename__}_{month:%Y_%m}"
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {DailyTopicArchive.__tablename__} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        created.append(name)
+        month = upper
+    return created
+
+
+async def archive_batch(db: AsyncSession, cutoff: datetime.datetime, batch_size: int) -> int:
+    version = (await bump_version(db, ETAG_TOPICS))[ETAG_TOPICS]
+    candidates = (
+        select(DailyTopic.id)
+        .where(DailyTopic.is_draft == False, DailyTopic.sent_at < cutoff)
+        .order_by(DailyTopic.sent_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(DailyTopic)
+        .where(DailyTopic.id.in_(candidates.scalar_subquery()))
+        .returning(*(DailyTopic.__table__.c[name] for name in _ARCHIVED_COLUMNS))
+        .cte("moved")
+    )
+    tombstones = (
+        insert(DailyTopicTombstone)
+        .from_select(["topic_id", "change_version"], select(moved.c.id, literal(version)))
+        .returning(DailyTopicTombstone.topic_id)
+        .cte("tombstones")
+    )
+    # Same snapshot as the DELETE, so the links removed by its cascade are still visible
+    email_ids = func.coalesce(
+        select(func.array_agg(EmailLogTopic.email_log_id))
+        .where(EmailLogTopic.daily_topic_id == moved.c.id)
+        .scalar_subquery(),
+        cast(literal("{}"), ARRAY(Integer)),
+    )
+    rows = (
+        select(*(moved.c[name] for name in _ARCHIVED_COLUMNS), TopicCategory.name, email_ids)
+        .select_from(moved.outerjoin(TopicCategory, TopicCategory.id == moved.c.category_id))
+    )
+    result = await db.execute(
+        insert(DailyTopicArchive)
+        .add_cte(moved, tombstones)
+        .from_select([*_ARCHIVED_COLUMNS, "category_name", "email_log_ids"], rows)
+    )
+    return result.rowcount
+
+
+async def run_archive(
+    db: AsyncSession, horizon_days: Optional[int] = None, batch_size: Optional[int] = None,
+) -> int:
+    """Archive due topics; returns 0 without waiting if another process is archiving."""
+    # db commits between batches and may change connection, so the
+    # session-level lock lives on a connection of its own
+    async with engine.connect() as lock_conn:
+        if not await lock_conn.scalar(select(func.pg_try_advisory_lock(ARCHIVE_RUN_LOCK_ID))):
+            return 0
+        await lock_conn.commit()
+        try:
+            return await _archive_due(db, horizon_days, batch_size)
+        finally:
+            await lock_conn.execute(select(func.pg_advisory_unlock(ARCHIVE_RUN_LOCK_ID)))
+            await lock_conn.commit()
+
+
+async def _archive_due(db: AsyncSession, horizon_days: Optional[int], batch_size: Optional[int]) -> int:
+    horizon_days = settings.ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cutoff = now - datetime.timedelta(days=horizon_days)
+
+    oldest = await db.scalar(
+        select(func.min(DailyTopic.sent_at)).where(DailyTopic.is_draft == False, DailyTopic.sent_at < cutoff)
+    )
+    if oldest is None:
+        await db.rollback()
+        return 0
+    await ensure_partitions(db, oldest, cutoff)
+    await db.commit()
+
+    total = 0
+    while True:
+        moved = await archive_batch(db, cutoff, batch_size)
+        await db.commit()
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+async def prune_tombstones(db: AsyncSession, retention_days: Optional[int] = None) -> int:
+    retention_days = settings.TOMBSTONE_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=retention_days)
+    result = await db.execute(
+        delete(DailyTopicTombstone)
+        .where(DailyTopicTombstone.deleted_at < cutoff)
+        .returning(DailyTopicTombstone.change_version)
+    )
+    pruned = result.scalars().all()
+    if pruned:
+        # Clients that synced before this version may have missed deletions
+        stmt = pg_insert(ChangeCounter).values(name=TOMBSTONES_PRUNED, version=max(pruned))
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[ChangeCounter.name],
+            set_={"version": func.greatest(ChangeCounter.version, stmt.excluded.version)},
+        ))
+    await db.commit()
+    return len(pruned)
+
+
+async def report(db: AsyncSession) -> dict:
+    partitions = (await db.execute(text(
+        "SELECT c.relname, pg_total_relation_size(c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        f"WHERE i.inhparent = '{DailyTopicArchive.__tablename__}'::regclass ORDER BY c.relname"
+    ))).all()
+    return {
+        "hot_rows": await db.scalar(select(func.count()).select_from(DailyTopic)),
+        "hot_sent_rows": await db.scalar(
+            select(func.count()).select_from(DailyTopic).where(DailyTopic.is_draft == False)
+        ),
+        "archived_rows": await db.scalar(select(func.count()).select_from(DailyTopicArchive)),
+        "tombstones": await db.scalar(select(func.count()).select_from(DailyTopicTombstone)),
+        "partitions": {name: size for name, size in partitions},
+    }
+
+
+class ArchiveScheduler:
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.last_moved = 0
+        self.total_moved = 0
+        self.last_run_at: Optional[str] = None
+
+    def start(self) -> None:
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        # First run shortly after startup so frequent restarts do not starve it
+        await asyncio.sleep(min(60, self.interval_seconds))
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    moved = await run_archive(db)
+                    await prune_tombstones(db)
+                self.runs += 1
+                self.last_moved = moved
+                self.total_moved += moved
+                self.last_run_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+                if moved:
+                    logger.info("Archived %s sent topics", moved)
+            except Exception:
+                logger.exception("Topic archival failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "last_moved": self.last_moved,
+            "total_moved": self.total_moved,
+            "last_run_at": self.last_run_at,
+        }
+
+
+archive_scheduler = ArchiveScheduler(settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+async def _main(command: str, horizon_days: Optional[int]) -> None:
+    async with AsyncSessionLocal() as db:
+        if command == "run":
+            print(f"Archivados {await run_archive(db, horizon_days)} temas.")
+            print(f"Eliminadas {await prune_tombstones(db)} marcas de borrado.")
+        else:
+            for key, value in (await report(db)).items():
+                print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["run", "report"])
+    parser.add_argument("--horizon-days", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(_main(args.command, args.horizon_days))
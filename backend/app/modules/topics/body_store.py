@@ -0,0 +1,176 @@
+"""Compressed storage for email_logs bodies.
+
+Bodies are zlib-compressed with a preset dictionary built from the markup
+that past newsletters share (template, category headers, inline styles).
+Dictionaries are immutable rows; the newest one is used for new emails.
+
+CLI:
+    python -m app.modules.topics.body_store train    # build a dictionary from recent emails
+    python -m app.modules.topics.body_store backfill # compress legacy plain-text bodies
+    python -m app.modules.topics.body_store report   # storage saved
+"""
+import argparse
+import asyncio
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.topics.models import EmailBodyDictionary, EmailLog
+
+DICTIONARY_MAX_BYTES = 32 * 1024  # zlib window size
+CURRENT_DICTIONARY_TTL_SECONDS = 600
+_TAG_RE = re.compile(r"<[^>]+>")
+
+_dictionaries: dict[int, bytes] = {}
+_current: Optional[tuple[float, Optional[int]]] = None
+
+
+def build_dictionary(samples: list[str], max_bytes: int = DICTIONARY_MAX_BYTES) -> bytes:
+    # Tags (with their inline styles) are what the newsletters repeat; keep the
+    # ones present in at least a quarter of the samples. zlib finds matches near
+    # the end of the dictionary cheapest, so the most frequent go last.
+    counts: Counter[str] = Counter()
+    for html in samples:
+        counts.update(set(_TAG_RE.findall(html)))
+    threshold = max(2, len(samples) // 4)
+    common = sorted((f for f, n in counts.items() if n >= threshold), key=lambda f: (counts[f], len(f)))
+    return "".join(common).encode("utf-8")[-max_bytes:]
+
+
+def compress(html: str, dictionary: Optional[bytes]) -> bytes:
+    comp = zlib.compressobj(9, zdict=dictionary) if dictionary else zlib.compressobj(9)
+    return comp.compress(html.encode("utf-8")) + comp.flush()
+
+
+def decompress(data: bytes, dictionary: Optional[bytes]) -> str:
+    decomp = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return (decomp.decompress(data) + decomp.flush()).decode("utf-8")
+
+
+async def _dictionary(db: AsyncSession, dictionary_id: int) -> bytes:
+    data = _dictionaries.get(dictionary_id)
+    if data is None:
+        data = await db.scalar(
+            select(EmailBodyDictionary.data).where(EmailBodyDictionary.id == dictionary_id)
+        )
+        _dictionaries[dictionary_id] = data
+    return data
+
+
+async def _current_dictionary_id(db: AsyncSession) -> Optional[int]:
+    global _current
+    if _current is None or time.monotonic() - _current[0] > CURRENT_DICTIONARY_TTL_SECONDS:
+        dictionary_id = await db.scalar(select(func.max(EmailBodyDictionary.id)))
+        _current = (time.monotonic(), dictionary_id)
+    return _current[1]
+
+
+async def encode_body(db: AsyncSession, html: str) -> tuple[bytes, Optional[int]]:
+    dictionary_id = await _current_dictionary_id(db)
+    dictionary = await _dictionary(db, dictionary_id) if dictionary_id else None
+    return compress(html, dictionary), dictionary_id
+
+
+async def decode_body(db: AsyncSession, log: EmailLog) -> str:
+    if log.html_body_z is None:
+        return log.html_body or ""
+    dictionary = await _dictionary(db, log.body_dictionary_id) if log.body_dictionary_id else None
+    return decompress(log.html_body_z, dictionary)
+
+
+async def train(db: AsyncSession, sample_size: int = 200) -> Optional[EmailBodyDictionary]:
+    result = await db.execute(
+        select(EmailLog).order_by(EmailLog.id.desc()).limit(sample_size)
+    )
+    samples = [await decode_body(db, log) for log in result.scalars().all()]
+    if len(samples) < 2:
+        return None
+    dictionary = EmailBodyDictionary(data=build_dictionary(samples), sample_count=len(samples))
+    db.add(dictionary)
+    await db.commit()
+    return dictionary
+
+
+async def backfill(db: AsyncSession, batch_size: int = 200) -> int:
+    done = 0
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(EmailLog.id, EmailLog.html_body)
+            .where(EmailLog.id > last_id, EmailLog.html_body_z.is_(None), EmailLog.html_body.is_not(None))
+            .order_by(EmailLog.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return done
+        for log_id, html in rows:
+            data, dictionary_id = await encode_body(db, html)
+            await db.execute(
+                update(EmailLog)
+                .where(EmailLog.id == log_id)
+                .values(html_body_z=data, body_dictionary_id=dictionary_id, html_body=None)
+            )
+        await db.commit()
+        done += len(rows)
+        last_id = rows[-1][0]
+
+
+async def report(db: AsyncSession) -> dict:
+    row = (await db.execute(
+        select(
+            func.count(EmailLog.id),
+            func.count(EmailLog.html_body_z),
+            func.coalesce(func.sum(func.octet_length(EmailLog.html_body)), 0),
+            func.coalesce(func.sum(func.octet_length(EmailLog.html_body_z)), 0),
+        )
+    )).one()
+    total, compressed, plain_bytes, compressed_bytes = row
+    # Original size of the compressed rows is not stored; sample it.
+    sample = (await db.execute(
+        select(EmailLog).where(EmailLog.html_body_z.is_not(None)).order_by(EmailLog.id.desc()).limit(100)
+    )).scalars().all()
+    ratio = 0.0
+    if sample:
+        raw = sum(len((await decode_body(db, log)).encode("utf-8")) for log in sample)
+        ratio = raw / sum(len(log.html_body_z) for log in sample)
+    table_bytes = await db.scalar(text("SELECT pg_total_relation_size('email_logs')"))
+    return {
+        "emails": total,
+        "compressed_emails": compressed,
+        "plain_body_bytes": plain_bytes,
+        "compressed_body_bytes": compressed_bytes,
+        "compression_ratio": round(ratio, 2),
+        "estimated_bytes_saved": int(compressed_bytes * ratio) - compressed_bytes if ratio else 0,
+        "table_total_bytes": table_bytes,
+    }
+
+
+async def _main(command: str, sample_size: int) -> None:
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        if command == "train":
+            dictionary = await train(db, sample_size)
+            if dictionary is None:
+                print("No hay suficientes correos para entrenar un diccionario.")
+            else:
+                print(f"Diccionario {dictionary.id}: {len(dictionary.data)} bytes, {dictionary.sample_count} correos.")
+        elif command == "backfill":
+            print(f"Comprimidos {await backfill(db)} correos.")
+        else:
+            for key, value in (await report(db)).items():
+                print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["train", "backfill", "report"])
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(_main(args.command, args.samples))
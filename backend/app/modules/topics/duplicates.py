@@ -0,0 +1,112 @@
+"""Near-duplicate detection for daily topics.
+
+Titles are stored normalized (accents folded, lowercase, punctuation
+removed) in daily_topics.title_norm, which has a pg_trgm GIN index. A check
+looks for trigram-similar titles and identical URLs among the drafts and
+the topics created in the last DUPLICATE_WINDOW_DAYS.
+
+CLI:
+    python -m app.modules.topics.duplicates backfill   # fill title_norm for older rows and auto topics
+"""
+import argparse
+import asyncio
+import datetime
+import re
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import func, literal, or_, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.modules.topics.models import AutoTopic, DailyTopic
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9ñ]+")
+
+
+def normalize_title(title: str) -> str:
+    # NFKD splits "á" into "a" + combining accent; ñ is kept as a letter of its own
+    text = unicodedata.normalize("NFKD", title.lower().replace("ñ", "\0"))
+    text = "".join(c for c in text if not unicodedata.combining(c)).replace("\0", "ñ")
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+async def find_duplicates(
+    db: AsyncSession,
+    title: str,
+    url: Optional[str] = None,
+    exclude_id: Optional[int] = None,
+    limit: int = 10,
+) -> list[dict]:
+    norm = normalize_title(title)
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=settings.DUPLICATE_WINDOW_DAYS)
+    recent = or_(DailyTopic.is_draft == True, DailyTopic.created_at >= since)
+    columns = (
+        DailyTopic.id, DailyTopic.title, DailyTopic.url, DailyTopic.is_draft,
+        DailyTopic.created_at, DailyTopic.sent_at,
+    )
+
+    queries = []
+    if norm:
+        # "%" is the indexable trigram match (pg_trgm.similarity_threshold, 0.3
+        # by default); the score filter narrows it to the configured threshold
+        score = func.similarity(DailyTopic.title_norm, norm)
+        queries.append(
+            select(*columns, score.label("score"), literal("title").label("reason"))
+            .where(DailyTopic.title_norm.op("%")(norm), score >= settings.DUPLICATE_SIMILARITY_THRESHOLD, recent)
+        )
+    if url:
+        queries.append(
+            select(*columns, literal(1.0).label("score"), literal("url").label("reason"))
+            .where(or_(DailyTopic.url == url, DailyTopic.original_url == url), recent)
+        )
+    if not queries:
+        return []
+    stmt = union_all(*queries).subquery()
+    query = select(stmt).order_by(stmt.c.score.desc(), stmt.c.created_at.desc())
+    if exclude_id is not None:
+        query = query.where(stmt.c.id != exclude_id)
+
+    # A topic matching by URL and by title is reported once, with its best reason
+    seen: dict[int, dict] = {}
+    for row in (await db.execute(query.limit(limit * 2))).mappings():
+        if row["id"] not in seen:
+            seen[row["id"]] = {**row, "score": round(float(row["score"]), 3)}
+    return list(seen.values())[:limit]
+
+
+async def backfill(db: AsyncSession, batch_size: int = 1000) -> int:
+    done = 0
+    for model in (AutoTopic, DailyTopic):
+        last_id = 0
+        while True:
+            rows = (await db.execute(
+                select(model.id, model.title)
+                .where(model.id > last_id, model.title_norm.is_(None))
+                .order_by(model.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            # Bulk UPDATE by primary key: one executemany per batch
+            await db.execute(
+                update(model), [{"id": row_id, "title_norm": normalize_title(title)} for row_id, title in rows]
+            )
+            await db.commit()
+            done += len(rows)
+            last_id = rows[-1][0]
+    return done
+
+
+async def _main() -> None:
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        print(f"Normalizados {await backfill(db)} títulos.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["backfill"])
+    parser.parse_args()
+    asyncio.run(_main())
@@ -0,0 +1,248 @@
+"""Live change feed for daily topics and categories.
+
+Service mutations call publish() inside their transaction; it issues
+pg_notify on CHANNEL, which Postgres delivers only if the transaction
+commits. Every API process keeps one LISTEN connection (ChangeFeed), loads
+the changed rows once per notification and fans the event out to its
+server-sent-events subscribers.
+
+Frames: `event: topic` or `event: category` with data
+{"op": "created" | "updated" | "deleted", "ids": [...], "items": [...]}
+(items only for created/updated). `event: resync` means events may have been
+missed and the client should reload its lists.
+
+A stream is authorized once, when it opens, so it closes itself when the
+access token expires and, checked every keepalive, when the user's security
+epoch changes (role change, deactivation, deletion). The client reconnects
+with its current token.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+import asyncpg
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.epochs import epoch_table
+from app.modules.topics.models import DailyTopic, TopicCategory
+from app.modules.topics.schemas import DailyTopicOut, TopicCategoryOut
+
+logger = logging.getLogger("uvicorn.error")
+
+CHANNEL = "topics_events"
+IDS_PER_NOTIFY = 500  # keeps payloads well under the 8000-byte NOTIFY limit
+RECONNECT_SECONDS = 5.0
+HEALTH_CHECK_SECONDS = 30.0
+CLIENT_RETRY_MS = 5000
+
+_adapters = {
+    "topic": TypeAdapter(list[DailyTopicOut]),
+    "category": TypeAdapter(list[TopicCategoryOut]),
+}
+
+
+async def publish(
+    db: AsyncSession,
+    entity: str,
+    created: Iterable[int] = (),
+    updated: Iterable[int] = (),
+    deleted: Iterable[int] = (),
+) -> None:
+    """Queue change notifications; they are sent when the caller commits."""
+    payloads = []
+    for op, ids in (("created", list(created)), ("updated", list(updated)), ("deleted", list(deleted))):
+        for i in range(0, len(ids), IDS_PER_NOTIFY):
+            payloads.append(json.dumps({"entity": entity, "op": op, "ids": ids[i:i + IDS_PER_NOTIFY]}))
+    if payloads:
+        await db.execute(select(*(func.pg_notify(CHANNEL, p) for p in payloads)))
+
+
+async def current_epoch(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Security epoch of an active user; None once deactivated or deleted."""
+    from app.modules.auth.models import User
+
+    epoch = await epoch_table.get(user_id, db)
+    if epoch is None:
+        # Users created since the table's last reload are not in it yet
+        epoch = await db.scalar(select(User.security_epoch).where(User.id == user_id, User.is_active == True))
+    return epoch
+
+
+def epoch_unchanged(user_id: int, epoch: Optional[int]) -> Callable[[], Awaitable[bool]]:
+    async def check() -> bool:
+        # The session only takes a connection if the epoch table must reload
+        async with AsyncSessionLocal() as db:
+            return epoch is not None and await current_epoch(db, user_id) == epoch
+    return check
+
+
+def _frame(event: str, data: dict, seq: Optional[int] = None) -> str:
+    head = f"id: {seq}\n" if seq is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def _load(entity: str, ids: list[int]) -> list[dict]:
+    async with AsyncSessionLocal() as db:
+        if entity == "topic":
+            stmt = (
+                select(DailyTopic)
+                .where(DailyTopic.id.in_(ids))
+                .options(joinedload(DailyTopic.category))
+                .order_by(DailyTopic.id)
+            )
+        else:
+            stmt = select(TopicCategory).where(TopicCategory.id.in_(ids)).order_by(TopicCategory.id)
+        rows = (await db.execute(stmt)).scalars().all()
+    adapter = _adapters[entity]
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+class ChangeFeed:
+    def __init__(self, queue_size: int, keepalive_seconds: float):
+        self.queue_size = queue_size
+        self.keepalive_seconds = keepalive_seconds
+        self._subscribers: set[asyncio.Queue] = set()
+        self._incoming: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self.connected = False
+        self.seq = 0
+        self.notifications = 0
+        self.frames_sent = 0
+        self.resyncs = 0
+        self.reconnects = 0
+        self.closed_unauthorized = 0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._incoming = asyncio.Queue()
+        self._tasks = [loop.create_task(self._listen()), loop.create_task(self._dispatch())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.connected = False
+
+    async def _listen(self) -> None:
+        # A dedicated connection, outside the pool: LISTEN holds it for good
+        connect_args = engine.url.translate_connect_args(username="user")
+        first = True
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(**connect_args)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self.connected = True
+                if not first:
+                    # Notifications sent while disconnected are gone
+                    self.reconnects += 1
+                    self._broadcast(_frame("resync", {}))
+                first = False
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), HEALTH_CHECK_SECONDS)
+                    except asyncio.TimeoutError:
+                        await conn.execute("SELECT 1", timeout=HEALTH_CHECK_SECONDS)
+                logger.warning("Change feed connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Change feed listener failed")
+            finally:
+                self.connected = False
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        self.notifications += 1
+        self._incoming.put_nowait(payload)
+
+    async def _dispatch(self) -> None:
+        # One consumer, so events reach subscribers in commit order
+        while True:
+            payload = await self._incoming.get()
+            try:
+                event = json.loads(payload)
+                self.seq += 1
+                if not self._subscribers:
+                    continue
+                data = {"op": event["op"], "ids": event["ids"]}
+                if event["op"] != "deleted":
+                    data["items"] = await _load(event["entity"], event["ids"])
+                self._broadcast(_frame(event["entity"], data, self.seq))
+            except Exception:
+                logger.exception("Change feed event failed: %s", payload)
+
+    def _broadcast(self, frame: str) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Too far behind: drop what is pending and make the client reload
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_frame("resync", {}))
+                self.resyncs += 1
+
+    async def stream(
+        self,
+        expires_at: Optional[float] = None,
+        authorized: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> AsyncIterator[str]:
+        """Frames until the client leaves, expires_at (unix time) passes or authorized() fails."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        next_check = time.monotonic() + self.keepalive_seconds
+        try:
+            yield f"retry: {CLIENT_RETRY_MS}\n" + _frame("ready", {"live": self.connected, "seq": self.seq})
+            while True:
+                timeout = self.keepalive_seconds
+                if expires_at is not None:
+                    timeout = min(timeout, expires_at - time.time())
+                if timeout <= 0:
+                    self.closed_unauthorized += 1
+                    return
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    frame = ": ping\n\n"
+                # Checked on a timer too: a busy stream never reaches the ping
+                if authorized is not None and time.monotonic() >= next_check:
+                    next_check = time.monotonic() + self.keepalive_seconds
+                    if not await authorized():
+                        self.closed_unauthorized += 1
+                        return
+                if expires_at is not None and time.time() >= expires_at:
+                    self.closed_unauthorized += 1
+                    return
+                self.frames_sent += 1
+                yield frame
+        finally:
+            self._subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "subscribers": len(self._subscribers),
+            "notifications": self.notifications,
+            "frames_sent": self.frames_sent,
+            "resyncs": self.resyncs,
+            "reconnects": self.reconnects,
+            "closed_unauthorized": self.closed_unauthorized,
+        }
+
+
+change_feed = ChangeFeed(settings.EVENTS_QUEUE_SIZE, settings.EVENTS_KEEPALIVE_SECONDS)
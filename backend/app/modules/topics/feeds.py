@@ -0,0 +1,325 @@
+"""Ingestion of the hot-topics and competitors feeds.
+
+The static host publishes last_screenshot.json (the hot topics each site
+currently shows, with the hours they have been there) and competitors.json
+({site: [competitor site, ...]}). FeedIngester polls both every
+FEEDS_INTERVAL_SECONDS with If-None-Match / If-Modified-Since and, when one
+changes, replaces hot_topics or feed_competitors in a single transaction.
+Sites are linked to domains.Domain by Domain.feed_key, or the first label of
+Domain.domain when it is not set; rows are relinked when domains change.
+
+Every API process runs the ingester, but a feed is only fetched by the
+process that claims its feed_states row for the interval.
+
+Any HTTP server can stand in for the host:
+    python -m http.server 8001 -d ./feeds
+    HOT_TOPICS_FEED_URL=http://localhost:8001/last_screenshot.json \\
+    COMPETITORS_FEED_URL=http://localhost:8001/competitors.json \\
+    python -m app.modules.topics.feeds run
+
+CLI:
+    python -m app.modules.topics.feeds run      # fetch both feeds now
+    python -m app.modules.topics.feeds status   # state of each feed
+"""
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import gzip
+import json
+import logging
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.etag import get_version
+from app.core.query_budget import query_budget
+from app.modules.domains.models import Domain
+from app.modules.domains.service import ETAG_DOMAINS
+from app.modules.topics.models import FeedCompetitor, FeedState, HotTopic
+
+logger = logging.getLogger("uvicorn.error")
+
+HOT_TOPICS = "hot_topics"
+COMPETITORS = "competitors"
+FEEDS_PAGE_DEFAULT = 200
+FEEDS_PAGE_MAX = 1000
+# permanence filters of the topics page legend, in hours: [low, high)
+PERMANENCE_RANGES = {"short": (None, 4), "medium": (4, 24), "long": (24, None)}
+
+
+@dataclasses.dataclass
+class FeedResponse:
+    status: int  # 200 or 304
+    body: Optional[bytes]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def fetch_feed(url: str, etag: Optional[str], last_modified: Optional[str], timeout: float) -> FeedResponse:
+    """Conditional GET (blocking; run it in a thread)."""
+    headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+            body = resp.read()
+            if resp.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            return FeedResponse(200, body, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304:
+            return FeedResponse(304, None, etag, last_modified)
+        raise
+
+
+def site_key(domain: str) -> str:
+    # Same rule the topics page used: "www.x.es" gives "www", so such
+    # domains need feed_key
+    return domain.strip().lower().split(".")[0]
+
+
+def parse_hot_topics(body: bytes) -> list[dict]:
+    # [{site, topics: [{url, hot_topic, permanence}]}], or the same keyed by site
+    data = json.loads(body)
+    rows = []
+    for entry in data if isinstance(data, list) else data.values():
+        site = str(entry.get("site") or "").strip()
+        if not site:
+            continue
+        for topic in entry.get("topics") or []:
+            title = str(topic.get("hot_topic") or "").strip()
+            url = str(topic.get("url") or "").strip()
+            if title and url:
+                rows.append({
+                    "site": site[:100], "title": title[:500], "url": url[:1000],
+                    "permanence": int(topic.get("permanence") or 0),
+                })
+    return rows
+
+
+def parse_competitors(body: bytes) -> list[dict]:
+    pairs = {}
+    for site, competitors in json.loads(body).items():
+        for competitor in competitors or []:
+            pair = (str(site).strip()[:100], str(competitor).strip()[:100])
+            if all(pair):
+                pairs[pair] = {"site": pair[0], "competitor": pair[1]}
+    return list(pairs.values())
+
+
+FEEDS = {
+    HOT_TOPICS: (HotTopic, parse_hot_topics, lambda: settings.HOT_TOPICS_FEED_URL),
+    COMPETITORS: (FeedCompetitor, parse_competitors, lambda: settings.COMPETITORS_FEED_URL),
+}
+
+
+async def _claim(db: AsyncSession, force: bool) -> list[FeedState]:
+    """Feeds this process should fetch now; marks them checked."""
+    interval = datetime.timedelta(seconds=settings.FEEDS_INTERVAL_SECONDS / 2)
+    stmt = pg_insert(FeedState).values([{"name": name, "checked_at": func.now()} for name in FEEDS])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FeedState.name],
+        set_={"checked_at": func.now()},
+        where=None if force else or_(FeedState.checked_at.is_(None), FeedState.checked_at < func.now() - interval),
+    ).returning(FeedState)
+    result = await db.execute(select(FeedState).from_statement(stmt))
+    return result.scalars().all()
+
+
+async def _domain_keys(db: AsyncSession) -> dict[str, int]:
+    keys: dict[str, int] = {}
+    for domain_id, domain, feed_key in await db.execute(
+        select(Domain.id, Domain.domain, Domain.feed_key).order_by(Domain.id)
+    ):
+        keys.setdefault((feed_key or site_key(domain)).lower(), domain_id)
+    return keys
+
+
+async def _relink(db: AsyncSession, model, keys: dict[str, int]) -> None:
+    domain_id = case(keys, value=func.lower(model.site), else_=None) if keys else None
+    await db.execute(update(model).values(domain_id=domain_id))
+
+
+async def run_once(db: AsyncSession, force: bool = False) -> dict[str, str]:
+    """Fetch the claimed feeds; returns feed name -> "changed" | "not_modified" | "error"."""
+    claimed = await _claim(db, force)
+    await db.commit()
+    if not claimed:
+        return {}
+
+    # No transaction is open while downloading
+    responses = await asyncio.gather(*(
+        asyncio.to_thread(
+            fetch_feed, FEEDS[state.name][2](), state.etag, state.last_modified, settings.FEEDS_TIMEOUT_SECONDS,
+        )
+        for state in claimed
+    ), return_exceptions=True)
+
+    outcome = {}
+    domains_version = await get_version(db, ETAG_DOMAINS)
+    keys = await _domain_keys(db)
+    for state, response in zip(claimed, responses):
+        model, parse, _ = FEEDS[state.name]
+        values = {"last_error": None}
+        try:
+            if isinstance(response, BaseException):
+                raise response
+            # A feed that fails to load keeps its previous rows
+            async with db.begin_nested():
+                if response.status == 200:
+                    rows = parse(response.body)
+                    for row in rows:
+                        row["domain_id"] = keys.get(row["site"].lower())
+                    await db.execute(delete(model))
+                    if rows:
+                        await db.execute(insert(model), rows)
+                    values.update(
+                        etag=response.etag, last_modified=response.last_modified, changed_at=func.now(),
+                        items=len(rows), domains_version=domains_version,
+                    )
+                    outcome[state.name] = "changed"
+                else:
+                    if state.domains_version != domains_version:
+                        await _relink(db, model, keys)
+                        values["domains_version"] = domains_version
+                    outcome[state.name] = "not_modified"
+        except Exception as exc:
+            logger.warning("Feed %s failed: %s", state.name, exc)
+            values = {"last_error": f"{type(exc).__name__}: {exc}"[:1000]}
+            outcome[state.name] = "error"
+        await db.execute(update(FeedState).where(FeedState.name == state.name).values(**values))
+    await db.commit()
+    return outcome
+
+
+def _decode_id_cursor(cursor: str) -> int:
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+@query_budget(1)
+async def list_hot_topics(
+    db: AsyncSession,
+    domain_id: Optional[int] = None,
+    competitor: Optional[str] = None,
+    permanence: Optional[str] = None,
+    limit: int = FEEDS_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+) -> tuple[list[HotTopic], Optional[str]]:
+    """Hot topics in feed order: a competitor's, a domain's, or all our domains'."""
+    stmt = select(HotTopic)
+    if competitor:
+        stmt = stmt.where(HotTopic.site == competitor)
+    elif domain_id is not None:
+        stmt = stmt.where(HotTopic.domain_id == domain_id)
+    else:
+        stmt = stmt.where(HotTopic.domain_id.is_not(None))
+    if permanence:
+        low, high = PERMANENCE_RANGES[permanence]
+        if low is not None:
+            stmt = stmt.where(HotTopic.permanence >= low)
+        if high is not None:
+            stmt = stmt.where(HotTopic.permanence < high)
+    if cursor:
+        stmt = stmt.where(HotTopic.id > _decode_id_cursor(cursor))
+    result = await db.execute(stmt.order_by(HotTopic.id).limit(limit + 1))
+    topics = result.scalars().all()
+    if len(topics) > limit:
+        topics = topics[:limit]
+        return topics, str(topics[-1].id)
+    return topics, None
+
+
+@query_budget(1)
+async def list_competitors(db: AsyncSession, domain_id: Optional[int] = None) -> list[FeedCompetitor]:
+    stmt = select(FeedCompetitor)
+    if domain_id is not None:
+        stmt = stmt.where(FeedCompetitor.domain_id == domain_id)
+    result = await db.execute(stmt.order_by(FeedCompetitor.site, FeedCompetitor.competitor))
+    return result.scalars().all()
+
+
+@query_budget(1)
+async def list_feed_states(db: AsyncSession) -> list[FeedState]:
+    result = await db.execute(select(FeedState).order_by(FeedState.name))
+    return result.scalars().all()
+
+
+class FeedIngester:
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.changed = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.last_run_at: Optional[str] = None
+
+    def start(self) -> None:
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def record(self, outcome: dict[str, str]) -> None:
+        self.runs += 1
+        self.changed += sum(1 for v in outcome.values() if v == "changed")
+        self.not_modified += sum(1 for v in outcome.values() if v == "not_modified")
+        self.errors += sum(1 for v in outcome.values() if v == "error")
+        self.last_run_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    self.record(await run_once(db))
+            except Exception:
+                logger.exception("Feed ingestion failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "changed": self.changed,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+        }
+
+
+feed_ingester = FeedIngester(settings.FEEDS_INTERVAL_SECONDS)
+
+
+async def _main(command: str) -> None:
+    async with AsyncSessionLocal() as db:
+        if command == "run":
+            for name, result in (await run_once(db, force=True)).items():
+                print(f"{name}: {result}")
+        for state in await list_feed_states(db):
+            print(
+                f"{state.name}: {state.items} filas, cambiado {state.changed_at}, "
+                f"comprobado {state.checked_at}" + (f", error: {state.last_error}" if state.last_error else "")
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["run", "status"])
+    args = parser.parse_args()
+    asyncio.run(_main(args.command))
@@ -1,13 +1,36 @@
 import datetime
 from typing import Optional
-from sqlalchemy import String, Boolean, Text, Integer, ForeignKey, DateTime
+from sqlalchemy import String, BigInteger, Boolean, Text, Integer, Computed, ForeignKey, Date, DateTime, Index, LargeBinary, text
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, RELATIONSHIP_LAZY
+
+# Spanish full-text vector of a topic: title weighted above the observation
+TOPIC_SEARCH_VECTOR = (
+    "setweight(to_tsvector('spanish', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce(observation, '')), 'B')"
+)
+
+
+class EmailBodyDictionary(Base):
+    __tablename__ = "email_body_dictionaries"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    sample_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
 
 
 class EmailLog(Base):
     __tablename__ = "email_logs"
+    __table_args__ = (
+        Index("ix_email_logs_sent_at_id", "sent_at", "id"),
+        Index("ix_email_logs_sender_email", "sender_email"),
+        Index("ix_email_logs_search", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     sent_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -17,8 +40,66 @@ class EmailLog(Base):
     sender_email: Mapped[str] = mapped_column(String(255), nullable=False)
     recipients: Mapped[str] = mapped_column(Text, nullable=False)  # JSON array
     subject: Mapped[str] = mapped_column(String(500), nullable=False)
-    html_body: Mapped[str] = mapped_column(Text, nullable=False)
+    # Legacy plain-text body; new rows store html_body_z (zlib, optionally with
+    # a shared preset dictionary). Read through topics.body_store.
+    html_body: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    html_body_z: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    body_dictionary_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("email_body_dictionaries.id"), nullable=True
+    )
     topic_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Subject and body text; the body is compressed, so it is computed on write
+    # (topics.search.email_search_vector)
+    search_vector: Mapped[Optional[str]] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+    outbox: Mapped[Optional["EmailOutbox"]] = relationship(
+        "EmailOutbox", uselist=False, lazy=RELATIONSHIP_LAZY, passive_deletes=True
+    )
+
+    @property
+    def delivery_status(self) -> str:
+        # Logs written before the outbox existed were sent synchronously
+        return self.outbox.status if self.outbox else "sent"
+
+
+class EmailOutbox(Base):
+    """Delivery job for an EmailLog, drained by topics.outbox.OutboxWorker."""
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_due", "next_attempt_at",
+            postgresql_where=text("status IN ('pending', 'sending')"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    email_log_id: Mapped[int] = mapped_column(
+        ForeignKey("email_logs.id", ondelete="CASCADE"), unique=True, nullable=False
+    )
+    status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)  # pending|sending|sent|failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    next_attempt_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    delivered_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class EmailLogTopic(Base):
+    """Topics included in each sent email."""
+
+    __tablename__ = "email_log_topics"
+    __table_args__ = (Index("ix_email_log_topics_daily_topic_id", "daily_topic_id"),)
+
+    email_log_id: Mapped[int] = mapped_column(
+        ForeignKey("email_logs.id", ondelete="CASCADE"), primary_key=True
+    )
+    daily_topic_id: Mapped[int] = mapped_column(
+        ForeignKey("daily_topics.id", ondelete="CASCADE"), primary_key=True
+    )
 
 
 class AutoTopic(Base):
@@ -26,10 +107,23 @@ class AutoTopic(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(200), nullable=False)
+    # copied to daily_topics.title_norm when the day's drafts are added
+    title_norm: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     display_order: Mapped[int] = mapped_column(Integer, default=0)
 
 
+class AutoTopicRun(Base):
+    """One row per day on which the auto topics were added to the drafts."""
+
+    __tablename__ = "auto_topic_runs"
+
+    day: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    applied_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
 class TopicCategory(Base):
     __tablename__ = "topic_categories"
 
@@ -37,19 +131,46 @@ class TopicCategory(Base):
     name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
     display_order: Mapped[int] = mapped_column(Integer, default=0)
     is_fixed: Mapped[bool] = mapped_column(Boolean, default=False)
-    topics: Mapped[list["DailyTopic"]] = relationship("DailyTopic", back_populates="category")
+    topics: Mapped[list["DailyTopic"]] = relationship(
+        "DailyTopic", back_populates="category", lazy=RELATIONSHIP_LAZY, passive_deletes=True
+    )
 
 
 class DailyTopic(Base):
     __tablename__ = "daily_topics"
+    # Keyset pagination is ordered by (created_at, id); each filter gets a
+    # matching composite index, and the draft view a small partial one.
+    __table_args__ = (
+        Index("ix_daily_topics_created_at_id", "created_at", "id"),
+        Index(
+            "ix_daily_topics_drafts_created_at_id", "created_at", "id",
+            postgresql_where=text("is_draft"),
+        ),
+        Index("ix_daily_topics_category_created_at_id", "category_id", "created_at", "id"),
+        Index("ix_daily_topics_source_created_at_id", "original_source", "created_at", "id"),
+        Index("ix_daily_topics_sent_at_id", "sent_at", "id"),
+        # needs the pg_trgm extension; see topics.duplicates
+        Index(
+            "ix_daily_topics_title_norm_trgm", "title_norm",
+            postgresql_using="gin", postgresql_ops={"title_norm": "gin_trgm_ops"},
+        ),
+        Index("ix_daily_topics_url", "url"),
+        Index("ix_daily_topics_original_url", "original_url"),
+        Index("ix_daily_topics_search", "search_vector", postgresql_using="gin"),
+        Index("ix_daily_topics_change_version", "change_version"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(200), nullable=False)
+    # normalized title for duplicate detection (topics.duplicates.normalize_title)
+    title_norm: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     url: Mapped[Optional[str]] = mapped_column(String(1000))
     include_url: Mapped[bool] = mapped_column(Boolean, default=False)
     observation: Mapped[Optional[str]] = mapped_column(Text)
     category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("topic_categories.id"), nullable=True)
-    category: Mapped[Optional["TopicCategory"]] = relationship("TopicCategory", back_populates="topics")
+    category: Mapped[Optional["TopicCategory"]] = relationship(
+        "TopicCategory", back_populates="topics", lazy=RELATIONSHIP_LAZY
+    )
     original_source: Mapped[Optional[str]] = mapped_column(String(100))
     original_url: Mapped[Optional[str]] = mapped_column(String(1000))
     created_at: Mapped[datetime.datetime] = mapped_column(
@@ -57,3 +178,100 @@ class DailyTopic(Base):
     )
     is_draft: Mapped[bool] = mapped_column(Boolean, default=True)
     sent_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True))
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, Computed(TOPIC_SEARCH_VECTOR, persisted=True), deferred=True
+    )
+    # change_counters["daily_topics"] version of the last write (GET /changes)
+    change_version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+
+
+class DailyTopicTombstone(Base):
+    """A deleted or archived daily topic, kept for delta sync."""
+
+    __tablename__ = "daily_topic_tombstones"
+
+    topic_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    change_version: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    deleted_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+
+
+class DailyTopicArchive(Base):
+    """Sent topics moved out of daily_topics by topics.archive.
+
+    Range-partitioned by month on sent_at; partitions are created by the
+    archive job as needed. Category name and email ids are copied because
+    the rows they point to may change or disappear.
+    """
+
+    __tablename__ = "daily_topics_archive"
+    __table_args__ = (
+        Index("ix_daily_topics_archive_sent_at_id", "sent_at", "id"),
+        Index("ix_daily_topics_archive_category_sent_at", "category_id", "sent_at"),
+        Index("ix_daily_topics_archive_search", "search_vector", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (sent_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    sent_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    title: Mapped[str] = mapped_column(String(200), nullable=False)
+    url: Mapped[Optional[str]] = mapped_column(String(1000))
+    include_url: Mapped[bool] = mapped_column(Boolean, default=False)
+    observation: Mapped[Optional[str]] = mapped_column(Text)
+    category_id: Mapped[Optional[int]] = mapped_column(Integer)
+    category_name: Mapped[Optional[str]] = mapped_column(String(100))
+    original_source: Mapped[Optional[str]] = mapped_column(String(100))
+    original_url: Mapped[Optional[str]] = mapped_column(String(1000))
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    email_log_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer), default=list, server_default="{}")
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, Computed(TOPIC_SEARCH_VECTOR, persisted=True), deferred=True
+    )
+    archived_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class FeedState(Base):
+    """Conditional-request state of an external feed ingested by topics.feeds."""
+
+    __tablename__ = "feed_states"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    etag: Mapped[Optional[str]] = mapped_column(String(255))
+    last_modified: Mapped[Optional[str]] = mapped_column(String(100))
+    checked_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True))
+    changed_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True))
+    items: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # domains change counter the rows were linked with
+    domains_version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+
+
+class HotTopic(Base):
+    """Current hot topics of every site in the feed, in feed order (id)."""
+
+    __tablename__ = "hot_topics"
+    __table_args__ = (
+        Index("ix_hot_topics_domain_id_id", "domain_id", "id"),
+        Index("ix_hot_topics_site_id", "site", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    site: Mapped[str] = mapped_column(String(100), nullable=False)
+    domain_id: Mapped[Optional[int]] = mapped_column(ForeignKey("domains.id", ondelete="SET NULL"))
+    title: Mapped[str] = mapped_column(String(500), nullable=False)
+    url: Mapped[str] = mapped_column(String(1000), nullable=False)
+    # hours the topic has been on the site's hot topics
+    permanence: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class FeedCompetitor(Base):
+    __tablename__ = "feed_competitors"
+
+    site: Mapped[str] = mapped_column(String(100), primary_key=True)
+    competitor: Mapped[str] = mapped_column(String(100), primary_key=True)
+    domain_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("domains.id", ondelete="SET NULL"), index=True
+    )
@@ -0,0 +1,130 @@
+"""Server-side rendering of the daily topics newsletter.
+
+Same markup the browser used to build in frontend-s3/js/topics-email.js.
+Templates live in ./templates and are read and compiled once per process;
+TEMPLATE_VERSION is a hash of their sources so cached renders are dropped
+when a deploy changes them.
+"""
+import functools
+import hashlib
+import html
+import math
+import pathlib
+from string import Template
+from typing import Optional
+
+from app.modules.topics.models import DailyTopic
+
+TEMPLATES_DIR = pathlib.Path(__file__).with_name("templates")
+
+CAT_COLORS = {
+    "COMUNES": "#E06000",
+    "NACIONAL": "#C00000",
+    "MADRID": "#003C71",
+    "ANDALUCIA": "#003C71",
+    "BALEARES": "#003C71",
+    "CANARIAS": "#003C71",
+    "CV/MURCIA": "#003C71",
+    "ASTURIAS/GALICIA": "#003C71",
+    "EXTREMADURA/ZAMORA": "#003C71",
+    "CATALUNA/ARAGON": "#003C71",
+    "INTERNACIONAL": "#1F5C99",
+    "ECONOMIA": "#7030A0",
+    "DEPORTES": "#375623",
+    "REVISTAS": "#1F4E79",
+    "RECURRENTES": "#555555",
+}
+DEFAULT_CAT_COLOR = "#003C71"
+UNCATEGORIZED = "RECURRENTES"
+TABLE_WIDTH = 640
+
+# (cache key, rendered topics table) for the current draft set
+_table_cache: Optional[tuple[tuple, str]] = None
+
+
+@functools.lru_cache(maxsize=1)
+def _load() -> tuple[str, dict[str, Template]]:
+    sources = {p.stem: p.read_text(encoding="utf-8") for p in sorted(TEMPLATES_DIR.glob("*.html"))}
+    digest = hashlib.sha1("".join(sources.values()).encode("utf-8")).hexdigest()[:12]
+    return digest, {name: Template(source) for name, source in sources.items()}
+
+
+def template_version() -> str:
+    return _load()[0]
+
+
+def _template(name: str) -> Template:
+    return _load()[1][name]
+
+
+def default_message() -> str:
+    return _template("intro").template.strip()
+
+
+def boilerplate_html() -> list[str]:
+    """The fixed text of every newsletter: the standard intro and the signature."""
+    return [default_message(), _template("signature").template]
+
+
+def group_topics(topics: list[DailyTopic]) -> list[tuple[str, list[DailyTopic]]]:
+    """Topics by category name, categories by display_order, uncategorized first."""
+    grouped: dict[str, tuple[int, list[DailyTopic]]] = {}
+    uncategorized = []
+    for topic in topics:
+        if topic.category is None:
+            uncategorized.append(topic)
+            continue
+        order = topic.category.display_order
+        grouped.setdefault(topic.category.name, (999 if order is None else order, []))[1].append(topic)
+    entries = [(name, items) for name, (_, items) in sorted(grouped.items(), key=lambda e: e[1][0])]
+    if uncategorized:
+        entries.insert(0, (UNCATEGORIZED, uncategorized))
+    return entries
+
+
+def _columns(topics: list[DailyTopic]) -> list[list[DailyTopic]]:
+    n = 1 if len(topics) <= 3 else 2 if len(topics) <= 6 else 3
+    size = math.ceil(len(topics) / n)
+    return [topics[i:i + size] for i in range(0, len(topics), size)]
+
+
+def _item(topic: DailyTopic) -> str:
+    if topic.include_url and topic.url:
+        return f'• <a href="{html.escape(topic.url)}" style="color:#1F5C99">{html.escape(topic.title)}</a>'
+    return f"• {html.escape(topic.title)}"
+
+
+def render_table(topics: list[DailyTopic]) -> str:
+    column, row = _template("topic_column"), _template("category_row")
+    rows = []
+    for name, items in group_topics(topics):
+        columns = _columns(items)
+        width = TABLE_WIDTH // len(columns)
+        cells = "".join(
+            column.substitute(width=width, items="<br>".join(_item(t) for t in col)) for col in columns
+        )
+        rows.append(row.substitute(
+            color=CAT_COLORS.get(name, DEFAULT_CAT_COLOR), name=html.escape(name), cells=cells,
+        ))
+    return _template("topics_table").substitute(rows="".join(rows))
+
+
+def cached_table(key: tuple) -> Optional[str]:
+    if _table_cache is not None and _table_cache[0] == key:
+        return _table_cache[1]
+    return None
+
+
+def store_table(key: tuple, table: str) -> None:
+    global _table_cache
+    _table_cache = (key, table)
+
+
+def render_newsletter(subject: str, message_html: Optional[str], table: str) -> str:
+    # message_html comes from the editor's rich-text field and is kept as is
+    return _template("newsletter").substitute(
+        subject=html.escape(subject),
+        message=default_message() if message_html is None else message_html,
+        table=table,
+        signature=_template("signature").template,
+    )
@@ -0,0 +1,198 @@
+"""Background delivery of queued topic emails.
+
+send_topics_email writes the EmailLog and its EmailOutbox row in the same
+transaction. OutboxWorker, started by the API lifespan, claims due rows with
+FOR UPDATE SKIP LOCKED (so every worker process can share the table), sends
+them through the SMTP pool and reschedules failures with exponential backoff.
+A claimed row gets a lease in next_attempt_at: if the process dies mid-send
+the row becomes due again once the lease expires. A job that fails for good
+puts the topics it had marked as sent back in the drafts.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import smtplib
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Optional
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.modules.auth.models import User
+from app.modules.topics import body_store, service
+from app.modules.topics.models import EmailLog, EmailOutbox
+from app.modules.topics.smtp_pool import smtp_pool
+
+logger = logging.getLogger("uvicorn.error")
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+def smtp_identity(sender_email: str) -> tuple[str, str]:
+    """(auth user, From address) for a sender.
+
+    The auth user is derived from the sender email and SMTP_AUTH_DOMAIN,
+    e.g. pespinosa@prensaiberica.es + renr.grupoepi.es → pespinosa@renr.grupoepi.es
+    """
+    if sender_email and settings.SMTP_AUTH_DOMAIN:
+        auth_user = f"{sender_email.split('@')[0]}@{settings.SMTP_AUTH_DOMAIN}"
+    else:
+        auth_user = settings.SMTP_USER
+    display_from = sender_email if sender_email else (settings.SMTP_FROM or auth_user)
+    return auth_user, display_from
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+def _is_permanent(exc: Exception) -> bool:
+    # 5xx replies (bad credentials, rejected recipients) will not fix themselves
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and 500 <= exc.smtp_code < 600
+
+
+class OutboxWorker:
+    def __init__(self, concurrency: int, poll_seconds: float):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: set[asyncio.Task] = set()
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def stop(self) -> None:
+        # Interrupted deliveries stay claimed and are picked up again when
+        # their lease expires.
+        tasks = list(self._deliveries)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            free = self.concurrency - len(self._deliveries)
+            if free > 0:
+                try:
+                    claimed = await self._claim(free)
+                except Exception:
+                    logger.exception("Outbox claim failed")
+                    claimed = []
+                for job_id, attempts in claimed:
+                    task = asyncio.get_running_loop().create_task(self._deliver(job_id, attempts))
+                    self._deliveries.add(task)
+                    task.add_done_callback(self._delivery_done)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _delivery_done(self, task: asyncio.Task) -> None:
+        self._deliveries.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Outbox delivery crashed", exc_info=task.exception())
+        # A slot is free and more jobs may be due
+        self._wake.set()
+
+    async def _claim(self, limit: int) -> list[tuple[int, int]]:
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status.in_(("pending", "sending")), EmailOutbox.next_attempt_at <= func.now())
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        lease = datetime.timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(due))
+                .values(status="sending", attempts=EmailOutbox.attempts + 1, next_attempt_at=func.now() + lease)
+                .returning(EmailOutbox.id, EmailOutbox.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = result.all()
+            await db.commit()
+        return [tuple(row) for row in claimed]
+
+    async def _deliver(self, job_id: int, attempts: int) -> None:
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(EmailLog, User.smtp_password)
+                .join(EmailOutbox, EmailOutbox.email_log_id == EmailLog.id)
+                .outerjoin(User, User.id == EmailLog.sender_id)
+                .where(EmailOutbox.id == job_id)
+            )).first()
+            if row is None:  # log deleted meanwhile
+                return
+            log, smtp_password = row
+            html_body = await body_store.decode_body(db, log)
+
+        recipients = json.loads(log.recipients)
+        auth_user, display_from = smtp_identity(log.sender_email)
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = log.subject
+        msg["From"] = display_from
+        msg["To"] = ", ".join(recipients)
+        msg.attach(MIMEText(html_body, "html", "utf-8"))
+
+        error: Optional[Exception] = None
+        try:
+            await smtp_pool.send(
+                settings.SMTP_HOST, settings.SMTP_PORT, auth_user, smtp_password or settings.SMTP_PASSWORD,
+                display_from, recipients, msg.as_bytes(),
+            )
+        except (smtplib.SMTPException, OSError) as exc:
+            error = exc
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if error is None:
+            values = {"status": "sent", "delivered_at": now, "last_error": None}
+            self.delivered += 1
+        elif _is_permanent(error) or attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            values = {"status": "failed", "last_error": str(error)}
+            self.failed += 1
+            logger.warning("Email log %s failed after %s attempts: %s", log.id, attempts, error)
+        else:
+            values = {
+                "status": "pending",
+                "last_error": str(error),
+                "next_attempt_at": now + datetime.timedelta(seconds=backoff_seconds(attempts)),
+            }
+            self.retried += 1
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(EmailOutbox).where(EmailOutbox.id == job_id).values(**values))
+            if values["status"] == "failed":
+                # Nothing went out: its topics go back to the drafts
+                await service.restore_unsent_drafts(db, log.id, log.sent_at)
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "in_flight": len(self._deliveries),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+outbox_worker = OutboxWorker(settings.OUTBOX_CONCURRENCY, settings.OUTBOX_POLL_SECONDS)
@@ -1,20 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_db, get_current_user, require_role
-from app.modules.topics import schemas, service
+from app.core.deps import bearer_scheme, get_db, get_current_user, require_role
+from app.core.etag import conditional_list
+from app.core.security import decode_token_claims
+from app.modules.topics import duplicates, events, feeds, schemas, search, service
+from app.modules.topics.events import change_feed
+from app.modules.topics.outbox import outbox_worker
 
 router = APIRouter()
 
 
+# ── Live changes ──────────────────────────────────────────────
+
+@router.get("/events")
+async def topic_events(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    # Authorized only here: the stream ends when the token expires or the
+    # user's security epoch changes
+    expires_at = decode_token_claims(credentials.credentials)["exp"]
+    epoch = await events.current_epoch(db, current_user.id)
+    # The stream can stay open for hours; give back the connection used by auth
+    await db.close()
+    return StreamingResponse(
+        change_feed.stream(expires_at=expires_at, authorized=events.epoch_unchanged(current_user.id, epoch)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ── Auto topics ──────────────────────────────────────────────
 
 @router.get("/auto", response_model=list[schemas.AutoTopicOut])
 async def list_auto_topics(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    return await service.list_auto_topics(db)
+    return await conditional_list(
+        request, db, service.ETAG_AUTO_TOPICS, service.list_auto_topics, schemas.AutoTopicOut
+    )
 
 
 @router.post("/auto", response_model=schemas.AutoTopicOut, status_code=status.HTTP_201_CREATED)
@@ -57,10 +89,13 @@ async def apply_auto_topics(
 
 @router.get("/categories", response_model=list[schemas.TopicCategoryOut])
 async def list_categories(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    return await service.list_categories(db)
+    return await conditional_list(
+        request, db, service.ETAG_CATEGORIES, service.list_categories, schemas.TopicCategoryOut
+    )
 
 
 @router.post("/categories", response_model=schemas.TopicCategoryOut, status_code=status.HTTP_201_CREATED)
@@ -95,10 +130,34 @@ async def delete_category(
 
 @router.get("/added", response_model=list[schemas.DailyTopicOut])
 async def list_topics(
+    response: Response,
+    is_draft: Optional[bool] = None,
+    category_id: Optional[int] = None,
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
+    original_source: Optional[str] = None,
+    limit: int = Query(service.TOPICS_PAGE_DEFAULT, ge=1, le=service.TOPICS_PAGE_MAX),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    return await service.list_topics(db)
+    topics, next_cursor = await service.list_topics(
+        db,
+        is_draft=is_draft,
+        category_id=category_id,
+        created_from=created_from,
+        created_to=created_to,
+        sent_from=sent_from,
+        sent_to=sent_to,
+        original_source=original_source,
+        limit=limit,
+        cursor=cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return topics
 
 
 @router.post("/added", response_model=schemas.DailyTopicOut, status_code=status.HTTP_201_CREATED)
@@ -110,6 +169,26 @@ async def create_topic(
     return await service.create_topic(body, db)
 
 
+@router.get("/added/duplicates", response_model=list[schemas.DuplicateCandidateOut])
+async def check_duplicates(
+    title: str,
+    url: Optional[str] = None,
+    exclude_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return await duplicates.find_duplicates(db, title, url=url, exclude_id=exclude_id)
+
+
+@router.post("/added/batch", response_model=schemas.DailyTopicBatchOut)
+async def batch_topics(
+    body: schemas.DailyTopicBatch,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return await service.batch_topics(body, db)
+
+
 @router.put("/added/{topic_id}", response_model=schemas.DailyTopicOut)
 async def update_topic(
     topic_id: int,
@@ -129,31 +208,182 @@ async def delete_topic(
     await service.delete_topic(topic_id, db)
 
 
+@router.get("/changes", response_model=schemas.TopicChangesOut)
+async def topic_changes(
+    since: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return await service.list_topic_changes(db, since)
+
+
+@router.get("/archive", response_model=list[schemas.ArchivedTopicOut])
+async def list_archived_topics(
+    response: Response,
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
+    category_id: Optional[int] = None,
+    original_source: Optional[str] = None,
+    limit: int = Query(service.TOPICS_PAGE_DEFAULT, ge=1, le=service.TOPICS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    topics, next_cursor = await service.list_archived_topics(
+        db, sent_from=sent_from, sent_to=sent_to, category_id=category_id,
+        original_source=original_source, limit=limit, cursor=cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return topics
+
+
+@router.get("/search", response_model=list[schemas.TopicSearchHit])
+async def search_topics(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    category_id: Optional[int] = None,
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = None,
+    limit: int = Query(search.SEARCH_PAGE_DEFAULT, ge=1, le=search.SEARCH_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    hits, next_cursor = await search.search_topics(
+        db, q, category_id=category_id, date_from=date_from, date_to=date_to, limit=limit, cursor=cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return hits
+
+
+@router.get("/added/{topic_id}/emails", response_model=list[schemas.EmailLogOut])
+async def list_topic_emails(
+    topic_id: int,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return await service.list_topic_emails(db, topic_id)
+
+
 # ── Email ──────────────────────────────────────────────
 
-@router.post("/send", status_code=status.HTTP_200_OK)
+@router.post("/send", response_model=schemas.SendEmailAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def send_email(
     body: schemas.SendEmailRequest,
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    await service.send_topics_email(
+    job = await service.send_topics_email(
         body.recipients, body.subject, body.html_body, db,
         sender_email=current_user.email,
-        sender_smtp_password=current_user.smtp_password or "",
+        sender_id=current_user.id,
+        topic_ids=body.topic_ids,
+    )
+    outbox_worker.wake()
+    return schemas.SendEmailAccepted(job_id=job.id, email_log_id=job.email_log_id)
+
+
+@router.post("/send/newsletter", response_model=schemas.SendEmailAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def send_newsletter(
+    body: schemas.SendNewsletterRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    job = await service.send_newsletter(
+        body.recipients, body.subject, body.topic_ids, db,
+        message_html=body.message_html,
+        sender_email=current_user.email,
         sender_id=current_user.id,
     )
-    return {"ok": True}
+    outbox_worker.wake()
+    return schemas.SendEmailAccepted(job_id=job.id, email_log_id=job.email_log_id)
+
+
+@router.post("/newsletter/preview", response_class=HTMLResponse)
+async def preview_newsletter(
+    body: schemas.NewsletterPreviewRequest,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    subject = body.subject
+    if subject is None:
+        subject = f"Temas del día SEO - {datetime.date.today():%d/%m/%Y}"
+    html = await service.preview_newsletter(db, subject, body.topic_ids, body.message_html)
+    return HTMLResponse(f'<!DOCTYPE html><html><body style="margin:8px;padding:0">{html}</body></html>')
+
+
+@router.get("/send/{job_id}", response_model=schemas.EmailOutboxOut)
+async def get_send_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    job = await service.get_outbox_job(db, job_id)
+    if not job:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Envío no encontrado")
+    return job
+
+
+@router.post("/send/{job_id}/retry", response_model=schemas.EmailOutboxOut)
+async def retry_send_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(require_role("admin")),
+):
+    job = await service.retry_outbox_job(db, job_id)
+    outbox_worker.wake()
+    return job
 
 
 # ── Email logs ──────────────────────────────────────────────
 
 @router.get("/email-logs", response_model=list[schemas.EmailLogOut])
 async def list_email_logs(
+    response: Response,
+    limit: int = Query(service.EMAIL_LOGS_PAGE_DEFAULT, ge=1, le=service.EMAIL_LOGS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    logs, next_cursor = await service.list_email_logs(db, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return logs
+
+
+@router.get("/email-logs/search", response_model=list[schemas.EmailLogSearchOut])
+async def search_email_logs(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
+    limit: int = Query(search.SEARCH_PAGE_DEFAULT, ge=1, le=search.SEARCH_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    hits, next_cursor = await search.search_email_logs(
+        db, q, sent_from=sent_from, sent_to=sent_to, limit=limit, cursor=cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [
+        schemas.EmailLogSearchOut(**schemas.EmailLogOut.model_validate(hit["log"]).model_dump(), rank=hit["rank"])
+        for hit in hits
+    ]
+
+
+@router.get("/email-logs/stats", response_model=schemas.EmailLogStatsOut)
+async def email_log_stats(
+    group_by: Optional[Literal["day", "sender"]] = None,
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
     db: AsyncSession = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    return await service.list_email_logs(db)
+    return await service.email_log_stats(db, group_by=group_by, sent_from=sent_from, sent_to=sent_to)
 
 
 @router.get("/email-logs/{log_id}", response_model=schemas.EmailLogDetailOut)
@@ -162,10 +392,11 @@ async def get_email_log(
     db: AsyncSession = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    log = await service.get_email_log(db, log_id)
-    if not log:
+    found = await service.get_email_log(db, log_id)
+    if not found:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Registro no encontrado")
-    return log
+    log, html_body = found
+    return schemas.EmailLogDetailOut(**schemas.EmailLogOut.model_validate(log).model_dump(), html_body=html_body)
 
 
 @router.delete("/email-logs/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -175,3 +406,59 @@ async def delete_email_log(
     _=Depends(require_role("admin")),
 ):
     await service.delete_email_log(db, log_id)
+
+
+# ── External feeds ──────────────────────────────────────────
+
+@router.get("/feeds/hot-topics", response_model=list[schemas.HotTopicOut])
+async def list_hot_topics(
+    response: Response,
+    domain_id: Optional[int] = None,
+    competitor: Optional[str] = None,
+    permanence: Optional[Literal["short", "medium", "long"]] = None,
+    limit: int = Query(feeds.FEEDS_PAGE_DEFAULT, ge=1, le=feeds.FEEDS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    topics, next_cursor = await feeds.list_hot_topics(
+        db, domain_id=domain_id, competitor=competitor, permanence=permanence, limit=limit, cursor=cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return topics
+
+
+@router.get("/feeds/competitors", response_model=list[schemas.FeedCompetitorOut])
+async def list_feed_competitors(
+    domain_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return await feeds.list_competitors(db, domain_id=domain_id)
+
+
+@router.get("/feeds", response_model=list[schemas.FeedSummaryOut])
+async def list_feeds(
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return await feeds.list_feed_states(db)
+
+
+@router.get("/feeds/status", response_model=list[schemas.FeedStateOut])
+async def feed_status(
+    db: AsyncSession = Depends(get_db),
+    _=Depends(require_role("admin")),
+):
+    # last_error holds upstream exception text
+    return await feeds.list_feed_states(db)
+
+
+@router.post("/feeds/refresh", response_model=list[schemas.FeedStateOut])
+async def refresh_feeds(
+    db: AsyncSession = Depends(get_db),
+    _=Depends(require_role("admin")),
+):
+    feeds.feed_ingester.record(await feeds.run_once(db, force=True))
+    return await feeds.list_feed_states(db)
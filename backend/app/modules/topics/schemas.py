@@ -1,6 +1,10 @@
 import datetime
 from typing import Optional
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, field_validator, model_validator
+
+# POST /added/batch: operations per request. The batch holds the daily_topics
+# change-counter lock until it commits.
+TOPICS_BATCH_MAX = 500
 
 
 class TopicCategoryCreate(BaseModel):
@@ -41,6 +45,28 @@ class DailyTopicUpdate(BaseModel):
     category_id: Optional[int] = None
 
 
+class DailyTopicBatchUpdate(DailyTopicUpdate):
+    id: int
+
+
+class DailyTopicBatch(BaseModel):
+    create: list[DailyTopicCreate] = []
+    update: list[DailyTopicBatchUpdate] = []
+    delete: list[int] = []
+
+    @model_validator(mode="after")
+    def check_operations(self) -> "DailyTopicBatch":
+        if len(self.create) + len(self.update) + len(self.delete) > TOPICS_BATCH_MAX:
+            raise ValueError(f"Máximo {TOPICS_BATCH_MAX} operaciones por lote")
+        update_ids = [u.id for u in self.update]
+        # UPDATE ... FROM (VALUES ...) would apply an arbitrary one of the repeated rows
+        if len(set(update_ids)) != len(update_ids) or len(set(self.delete)) != len(self.delete):
+            raise ValueError("Un tema aparece repetido en el lote")
+        if set(update_ids) & set(self.delete):
+            raise ValueError("Un tema no puede editarse y eliminarse en el mismo lote")
+        return self
+
+
 class AutoTopicCreate(BaseModel):
     title: str
     display_order: int = 0
@@ -72,13 +98,109 @@ class DailyTopicOut(BaseModel):
     created_at: datetime.datetime
     is_draft: bool
     sent_at: Optional[datetime.datetime]
+    change_version: int
+    model_config = {"from_attributes": True}
+
+
+class DailyTopicBatchOut(BaseModel):
+    created: list[DailyTopicOut]
+    updated: list[DailyTopicOut]
+    deleted: list[int]
+
+
+class TopicChangesOut(BaseModel):
+    version: int  # pass as `since` on the next call
+    reset: bool  # reload the full list, then sync from `version`
+    upserted: list[DailyTopicOut]
+    deleted: list[int]
+
+
+class ArchivedTopicOut(BaseModel):
+    id: int
+    title: str
+    url: Optional[str]
+    include_url: bool
+    observation: Optional[str]
+    category_id: Optional[int]
+    category_name: Optional[str]
+    original_source: Optional[str]
+    original_url: Optional[str]
+    created_at: datetime.datetime
+    sent_at: datetime.datetime
+    email_log_ids: list[int]
     model_config = {"from_attributes": True}
 
 
+class DuplicateCandidateOut(BaseModel):
+    id: int
+    title: str
+    url: Optional[str]
+    is_draft: bool
+    created_at: datetime.datetime
+    sent_at: Optional[datetime.datetime]
+    score: float
+    reason: str  # "title" | "url"
+
+
+class TopicSearchHit(BaseModel):
+    id: int
+    title: str
+    observation: Optional[str]
+    url: Optional[str]
+    category_id: Optional[int]
+    category_name: Optional[str]
+    created_at: datetime.datetime
+    sent_at: Optional[datetime.datetime]
+    is_draft: bool
+    archived: bool
+    rank: float
+
+
 class SendEmailRequest(BaseModel):
     recipients: list[str]
     subject: str
     html_body: str
+    topic_ids: Optional[list[int]] = None
+
+
+class SendNewsletterRequest(BaseModel):
+    recipients: list[str]
+    subject: str
+    topic_ids: list[int]
+    # Intro paragraph from the editor; the standard greeting when omitted
+    message_html: Optional[str] = None
+
+    @field_validator("topic_ids")
+    @classmethod
+    def topic_ids_not_empty(cls, v: list[int]) -> list[int]:
+        if not v:
+            raise ValueError("No hay temas que enviar")
+        return v
+
+
+class NewsletterPreviewRequest(BaseModel):
+    # The same topic_ids the send will get, so preview and email match
+    topic_ids: list[int]
+    subject: Optional[str] = None
+    message_html: Optional[str] = None
+
+
+class SendEmailAccepted(BaseModel):
+    ok: bool = True
+    job_id: int
+    email_log_id: int
+
+
+class EmailOutboxOut(BaseModel):
+    id: int
+    email_log_id: int
+    status: str
+    attempts: int
+    next_attempt_at: datetime.datetime
+    last_error: Optional[str] = None
+    delivered_at: Optional[datetime.datetime] = None
+
+    model_config = {"from_attributes": True}
 
 
 class EmailLogOut(BaseModel):
@@ -88,6 +210,7 @@ class EmailLogOut(BaseModel):
     recipients: list[str]
     subject: str
     topic_count: int
+    delivery_status: str = "sent"
 
     @field_validator("recipients", mode="before")
     @classmethod
@@ -100,5 +223,50 @@ class EmailLogOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class EmailLogSearchOut(EmailLogOut):
+    rank: float
+
+
 class EmailLogDetailOut(EmailLogOut):
     html_body: str
+
+
+class EmailLogStatsGroup(BaseModel):
+    key: str
+    emails: int
+    topics: int
+
+
+class EmailLogStatsOut(BaseModel):
+    emails: int
+    topics: int
+    groups: list[EmailLogStatsGroup] = []
+
+
+class HotTopicOut(BaseModel):
+    id: int
+    site: str
+    domain_id: Optional[int]
+    title: str
+    url: str
+    permanence: int
+    model_config = {"from_attributes": True}
+
+
+class FeedCompetitorOut(BaseModel):
+    site: str
+    competitor: str
+    domain_id: Optional[int]
+    model_config = {"from_attributes": True}
+
+
+class FeedSummaryOut(BaseModel):
+    name: str
+    changed_at: Optional[datetime.datetime]
+    items: int
+    model_config = {"from_attributes": True}
+
+
+class FeedStateOut(FeedSummaryOut):
+    checked_at: Optional[datetime.datetime]
+    last_error: Optional[str]
@@ -0,0 +1,220 @@
+"""Spanish full-text search over topics (live and archived) and sent emails.
+
+daily_topics and daily_topics_archive carry a generated search_vector
+column. email_logs bodies are stored compressed, so their vector is
+computed from the extracted text when the log is written, leaving out the
+standard intro and the signature: every newsletter carries them, so they
+would match common words in all emails and dilute the ranking.
+
+CLI:
+    python -m app.modules.topics.search backfill             # vectors for older email logs
+    python -m app.modules.topics.search backfill --rebuild   # recompute all of them
+"""
+import argparse
+import asyncio
+import datetime
+import functools
+from html.parser import HTMLParser
+from typing import Optional
+
+from sqlalchemy import REAL, ColumnElement, cast, false, func, literal, literal_column, select, true, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, joinedload
+
+from app.core.pagination import decode_rank_cursor, encode_rank_cursor
+from app.core.query_budget import query_budget
+from app.modules.topics import body_store, newsletter
+from app.modules.topics.models import DailyTopic, DailyTopicArchive, EmailLog, TopicCategory
+
+SEARCH_CONFIG = "spanish"
+# Inlined, not bound: a bound parameter is sent as varchar, which has no
+# implicit cast to regconfig or to setweight's "char"
+_CONFIG = literal_column(f"'{SEARCH_CONFIG}'", REGCONFIG)
+_WEIGHT_A = literal_column("'A'")
+_WEIGHT_B = literal_column("'B'")
+SEARCH_PAGE_DEFAULT = 50
+SEARCH_PAGE_MAX = 200
+
+
+class _TextExtractor(HTMLParser):
+    _SKIP = {"style", "script", "head"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: list[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        text = " ".join(data.split())
+        if not self._skipping and text:
+            self.parts.append(text)
+
+
+def _text_parts(html: str) -> list[str]:
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return parser.parts
+
+
+@functools.lru_cache(maxsize=4)
+def _boilerplate(template_version: str) -> frozenset[str]:
+    return frozenset(part for html in newsletter.boilerplate_html() for part in _text_parts(html))
+
+
+def email_text(html: str) -> str:
+    """Text of an email body without the newsletter's fixed intro and signature."""
+    skip = _boilerplate(newsletter.template_version())
+    return " ".join(part for part in _text_parts(html) if part not in skip)
+
+
+def email_search_vector(subject: str, html: str) -> ColumnElement:
+    return func.setweight(func.to_tsvector(_CONFIG, subject), _WEIGHT_A).op("||")(
+        func.setweight(func.to_tsvector(_CONFIG, email_text(html)), _WEIGHT_B)
+    )
+
+
+def _query(q: str):
+    # websearch syntax: "frase exacta", -excluir, OR
+    return func.websearch_to_tsquery(_CONFIG, q)
+
+
+def _page(rows: list, limit: int) -> tuple[list, Optional[str]]:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_rank_cursor(rows[-1]["rank"], rows[-1]["id"])
+    return rows, None
+
+
+@query_budget(1)
+async def search_topics(
+    db: AsyncSession,
+    q: str,
+    category_id: Optional[int] = None,
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = None,
+    limit: int = SEARCH_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """Live and archived topics matching q, best rank first. Dates apply to created_at."""
+    tsquery = _query(q)
+
+    hot_rank = func.ts_rank_cd(DailyTopic.search_vector, tsquery)
+    hot = (
+        select(
+            DailyTopic.id, DailyTopic.title, DailyTopic.observation, DailyTopic.url,
+            DailyTopic.category_id, TopicCategory.name.label("category_name"),
+            DailyTopic.created_at, DailyTopic.sent_at, DailyTopic.is_draft,
+            false().label("archived"), hot_rank.label("rank"),
+        )
+        .outerjoin(TopicCategory, TopicCategory.id == DailyTopic.category_id)
+        .where(DailyTopic.search_vector.op("@@")(tsquery))
+    )
+    archived_rank = func.ts_rank_cd(DailyTopicArchive.search_vector, tsquery)
+    archived = (
+        select(
+            DailyTopicArchive.id, DailyTopicArchive.title, DailyTopicArchive.observation, DailyTopicArchive.url,
+            DailyTopicArchive.category_id, DailyTopicArchive.category_name,
+            DailyTopicArchive.created_at, DailyTopicArchive.sent_at, false().label("is_draft"),
+            true().label("archived"), archived_rank.label("rank"),
+        )
+        .where(DailyTopicArchive.search_vector.op("@@")(tsquery))
+    )
+    if category_id is not None:
+        hot = hot.where(DailyTopic.category_id == category_id)
+        archived = archived.where(DailyTopicArchive.category_id == category_id)
+    if date_from is not None:
+        hot = hot.where(DailyTopic.created_at >= date_from)
+        # sent_at >= created_at, so this also prunes whole archive partitions
+        archived = archived.where(DailyTopicArchive.created_at >= date_from, DailyTopicArchive.sent_at >= date_from)
+    if date_to is not None:
+        hot = hot.where(DailyTopic.created_at < date_to)
+        archived = archived.where(DailyTopicArchive.created_at < date_to)
+
+    hits = union_all(hot, archived).subquery()
+    stmt = select(hits)
+    if cursor:
+        after_rank, after_id = decode_rank_cursor(cursor)
+        stmt = stmt.where(tuple_(hits.c.rank, hits.c.id) < tuple_(cast(literal(after_rank), REAL), after_id))
+    limit = max(1, min(limit, SEARCH_PAGE_MAX))
+    result = await db.execute(stmt.order_by(hits.c.rank.desc(), hits.c.id.desc()).limit(limit + 1))
+    return _page([dict(row) for row in result.mappings()], limit)
+
+
+@query_budget(1)
+async def search_email_logs(
+    db: AsyncSession,
+    q: str,
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
+    limit: int = SEARCH_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+) -> tuple[list[dict], Optional[str]]:
+    tsquery = _query(q)
+    rank = func.ts_rank_cd(EmailLog.search_vector, tsquery).label("rank")
+    stmt = (
+        select(EmailLog, rank)
+        .where(EmailLog.search_vector.op("@@")(tsquery))
+        .options(
+            defer(EmailLog.html_body, raiseload=True), defer(EmailLog.html_body_z, raiseload=True),
+            joinedload(EmailLog.outbox),
+        )
+    )
+    if sent_from is not None:
+        stmt = stmt.where(EmailLog.sent_at >= sent_from)
+    if sent_to is not None:
+        stmt = stmt.where(EmailLog.sent_at < sent_to)
+    if cursor:
+        after_rank, after_id = decode_rank_cursor(cursor)
+        stmt = stmt.where(tuple_(rank, EmailLog.id) < tuple_(cast(literal(after_rank), REAL), after_id))
+    limit = max(1, min(limit, SEARCH_PAGE_MAX))
+    result = await db.execute(stmt.order_by(rank.desc(), EmailLog.id.desc()).limit(limit + 1))
+    rows = [{"log": log, "rank": value, "id": log.id} for log, value in result.all()]
+    return _page(rows, limit)
+
+
+async def backfill(db: AsyncSession, batch_size: int = 200, rebuild: bool = False) -> int:
+    """Compute missing email vectors, or all of them with rebuild."""
+    done = 0
+    last_id = 0
+    while True:
+        stmt = select(EmailLog).where(EmailLog.id > last_id)
+        if not rebuild:
+            stmt = stmt.where(EmailLog.search_vector.is_(None))
+        logs = (await db.execute(stmt.order_by(EmailLog.id).limit(batch_size))).scalars().all()
+        if not logs:
+            return done
+        for log in logs:
+            html = await body_store.decode_body(db, log)
+            await db.execute(
+                update(EmailLog)
+                .where(EmailLog.id == log.id)
+                .values(search_vector=email_search_vector(log.subject, html))
+            )
+        await db.commit()
+        done += len(logs)
+        last_id = logs[-1].id
+
+
+async def _main(rebuild: bool) -> None:
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        print(f"Indexados {await backfill(db, rebuild=rebuild)} correos.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--rebuild", action="store_true", help="recompute every email vector")
+    args = parser.parse_args()
+    asyncio.run(_main(args.rebuild))
@@ -1,16 +1,36 @@
-import asyncio
 import datetime
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from typing import Optional
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-
-from app.modules.topics.models import AutoTopic, TopicCategory, DailyTopic, EmailLog
-from app.modules.topics.schemas import AutoTopicCreate, AutoTopicUpdate, TopicCategoryCreate, DailyTopicCreate, DailyTopicUpdate
+from sqlalchemy import Boolean, Date, Integer, String, cast, column, delete, exists, func, insert, literal, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased, defer, joinedload, selectinload
+
+from app.core.config import settings
+from app.core.etag import bump_version, get_versions
+from app.core.models import ChangeCounter
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.query_budget import query_budget
+from app.modules.topics import body_store, events, newsletter, search
+from app.modules.topics.duplicates import normalize_title
+from app.modules.topics.models import AutoTopic, AutoTopicRun, TopicCategory, DailyTopic, DailyTopicArchive, DailyTopicTombstone, EmailLog, EmailLogTopic, EmailOutbox
+from app.modules.topics.schemas import AutoTopicCreate, AutoTopicUpdate, TopicCategoryCreate, DailyTopicBatch, DailyTopicCreate, DailyTopicUpdate
+
+# change-counter groups behind the ETags of the reference-data endpoints
+ETAG_AUTO_TOPICS = "auto_topics"
+ETAG_CATEGORIES = "topic_categories"
+# not served with an ETag; versions the draft set for the newsletter preview
+# and is stamped on written rows as daily_topics.change_version
+ETAG_TOPICS = "daily_topics"
+# highest change_version of the tombstones pruned so far (topics.archive)
+TOMBSTONES_PRUNED = "daily_topic_tombstones_pruned"
+# more changes than this and the client is told to reload the full list
+CHANGES_MAX = 1000
+
+TOPICS_PAGE_DEFAULT = 200
+TOPICS_PAGE_MAX = 1000
+EMAIL_LOGS_PAGE_DEFAULT = 200
+EMAIL_LOGS_PAGE_MAX = 1000
 
 AUTO_TOPICS_DEFAULT = [
     ("Calendario Laboral/Escolar 2025 en ZONA", 1),
@@ -20,23 +40,32 @@ AUTO_TOPICS_DEFAULT = [
 
 
 async def seed_auto_topics(db: AsyncSession) -> None:
-    for title, order in AUTO_TOPICS_DEFAULT:
-        result = await db.execute(select(AutoTopic).where(AutoTopic.title == title))
-        if not result.scalars().first():
-            db.add(AutoTopic(title=title, display_order=order))
-    await db.commit()
+    # auto_topics.title is not unique, so insert only the titles still missing
+    seed = values(
+        column("title", String), column("display_order", Integer), column("title_norm", String), name="seed"
+    ).data([(title, order, normalize_title(title)) for title, order in AUTO_TOPICS_DEFAULT])
+    await db.execute(
+        insert(AutoTopic).from_select(
+            ["title", "display_order", "title_norm"],
+            select(seed.c.title, seed.c.display_order, seed.c.title_norm).where(
+                ~exists().where(AutoTopic.title == seed.c.title)
+            ),
+        )
+    )
 
 
 # ── Auto topics ──────────────────────────────────────────────
 
+@query_budget(1)
 async def list_auto_topics(db: AsyncSession) -> list[AutoTopic]:
     result = await db.execute(select(AutoTopic).order_by(AutoTopic.display_order))
     return result.scalars().all()
 
 
 async def create_auto_topic(data: AutoTopicCreate, db: AsyncSession) -> AutoTopic:
-    auto = AutoTopic(title=data.title, display_order=data.display_order)
+    auto = AutoTopic(title=data.title, title_norm=normalize_title(data.title), display_order=data.display_order)
     db.add(auto)
+    await bump_version(db, ETAG_AUTO_TOPICS)
     await db.commit()
     await db.refresh(auto)
     return auto
@@ -49,10 +78,12 @@ async def update_auto_topic(auto_id: int, data: AutoTopicUpdate, db: AsyncSessio
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Tema automático no encontrado")
     if data.title is not None:
         auto.title = data.title
+        auto.title_norm = normalize_title(data.title)
     if data.is_active is not None:
         auto.is_active = data.is_active
     if data.display_order is not None:
         auto.display_order = data.display_order
+    await bump_version(db, ETAG_AUTO_TOPICS)
     await db.commit()
     await db.refresh(auto)
     return auto
@@ -64,33 +95,54 @@ async def delete_auto_topic(auto_id: int, db: AsyncSession) -> None:
     if not auto:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Tema automático no encontrado")
     await db.delete(auto)
+    await bump_version(db, ETAG_AUTO_TOPICS)
     await db.commit()
 
 
+@query_budget(4)
 async def apply_auto_topics(db: AsyncSession) -> list[DailyTopic]:
-    # Resolve COMUNES category id
-    cat_result = await db.execute(select(TopicCategory).where(TopicCategory.name == "COMUNES"))
-    comunes = cat_result.scalar_one_or_none()
-    comunes_id = comunes.id if comunes else None
-
-    result = await db.execute(
-        select(AutoTopic).where(AutoTopic.is_active == True).order_by(AutoTopic.display_order)
-    )
-    autos = result.scalars().all()
-    ids = []
-    for auto in autos:
-        topic = DailyTopic(title=auto.title, category_id=comunes_id)
-        db.add(topic)
-        await db.flush()
-        ids.append(topic.id)
-    await db.commit()
+    comunes_id = await fixed_category_id(db, "COMUNES")
+    # Claiming today's auto_topic_runs row makes this idempotent per day: a
+    # concurrent call waits on the primary key, then inserts nothing. The day
+    # is the editors', not the session's (UTC).
+    today = cast(func.timezone(settings.TOPICS_TIMEZONE, func.now()), Date)
+    run = (
+        pg_insert(AutoTopicRun)
+        .values(day=today)
+        .on_conflict_do_nothing()
+        .returning(AutoTopicRun.day)
+        .cte("run")
+    )
+    # Same upsert as bump_version, run only by the call that claimed the day
+    bump = pg_insert(ChangeCounter).from_select(
+        ["name", "version"], select(literal(ETAG_TOPICS), literal(1)).where(exists(select(run.c.day)))
+    )
+    bump = (
+        bump.on_conflict_do_update(
+            index_elements=[ChangeCounter.name], set_={"version": ChangeCounter.version + 1},
+        )
+        .returning(ChangeCounter.version)
+        .cte("bump")
+    )
+    autos = (
+        select(AutoTopic.title, AutoTopic.title_norm, literal(comunes_id, Integer), bump.c.version)
+        .where(AutoTopic.is_active == True)
+        .order_by(AutoTopic.display_order)
+    )
+    stmt = (
+        insert(DailyTopic)
+        .add_cte(run, bump)
+        .from_select(["title", "title_norm", "category_id", "change_version"], autos)
+        .returning(DailyTopic)
+    )
     result = await db.execute(
-        select(DailyTopic)
-        .where(DailyTopic.id.in_(ids))
-        .options(selectinload(DailyTopic.category))
-        .order_by(DailyTopic.id)
+        select(DailyTopic).from_statement(stmt).options(selectinload(DailyTopic.category))
     )
-    return result.scalars().all()
+    topics = sorted(result.scalars().all(), key=lambda t: t.id)
+    if topics:
+        await events.publish(db, "topic", created=[t.id for t in topics])
+    await db.commit()
+    return topics
 
 
 FIXED_CATEGORIES = [
@@ -101,20 +153,37 @@ FIXED_CATEGORIES = [
 ]
 
 
+# name -> id of the fixed categories. They cannot be deleted, so the ids are
+# stable for the life of the process.
+_fixed_category_ids: dict[str, int] = {}
+
+
 async def seed_fixed_categories(db: AsyncSession) -> None:
-    for name, order in FIXED_CATEGORIES:
-        result = await db.execute(select(TopicCategory).where(TopicCategory.name == name))
-        cat = result.scalar_one_or_none()
-        if not cat:
-            db.add(TopicCategory(name=name, display_order=order, is_fixed=True))
-        else:
-            cat.is_fixed = True
-            cat.display_order = order
-    await db.commit()
+    stmt = pg_insert(TopicCategory).values(
+        [{"name": name, "display_order": order, "is_fixed": True} for name, order in FIXED_CATEGORIES]
+    )
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TopicCategory.name],
+            set_={"is_fixed": True, "display_order": stmt.excluded.display_order},
+        ).returning(TopicCategory.name, TopicCategory.id)
+    )
+    _fixed_category_ids.update(result.all())
+
+
+async def fixed_category_id(db: AsyncSession, name: str) -> Optional[int]:
+    # Processes that skipped seeding (fingerprint unchanged) load them once
+    if not _fixed_category_ids:
+        result = await db.execute(
+            select(TopicCategory.name, TopicCategory.id).where(TopicCategory.is_fixed == True)
+        )
+        _fixed_category_ids.update(result.all())
+    return _fixed_category_ids.get(name)
 
 
 # ── Categories ──────────────────────────────────────────────
 
+@query_budget(1)
 async def list_categories(db: AsyncSession) -> list[TopicCategory]:
     # Temporales (is_fixed=False) primero, luego fijas ordenadas por display_order
     result = await db.execute(
@@ -133,6 +202,8 @@ async def create_category(data: TopicCategoryCreate, db: AsyncSession) -> TopicC
         raise HTTPException(status.HTTP_409_CONFLICT, detail="Categoría ya existe")
     cat = TopicCategory(name=data.name, display_order=data.display_order)
     db.add(cat)
+    await bump_version(db, ETAG_CATEGORIES)
+    await events.publish(db, "category", created=[cat.id])
     await db.commit()
     await db.refresh(cat)
     return cat
@@ -150,11 +221,14 @@ async def update_category(cat_id: int, data: TopicCategoryCreate, db: AsyncSessi
         raise HTTPException(status.HTTP_409_CONFLICT, detail="Nombre ya en uso")
     cat.name = data.name
     cat.display_order = data.display_order
+    await bump_version(db, ETAG_CATEGORIES)
+    await events.publish(db, "category", updated=[cat_id])
     await db.commit()
     await db.refresh(cat)
     return cat
 
 
+@query_budget(6)
 async def delete_category(cat_id: int, db: AsyncSession) -> None:
     result = await db.execute(select(TopicCategory).where(TopicCategory.id == cat_id))
     cat = result.scalar_one_or_none()
@@ -162,40 +236,123 @@ async def delete_category(cat_id: int, db: AsyncSession) -> None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
     if cat.is_fixed:
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Las categorías fijas no se pueden eliminar")
+    versions = await bump_version(db, ETAG_CATEGORIES, ETAG_TOPICS)
     # unlink topics instead of blocking
-    topics = await db.execute(select(DailyTopic).where(DailyTopic.category_id == cat_id))
-    for t in topics.scalars().all():
-        t.category_id = None
+    unlinked = await db.execute(
+        update(DailyTopic)
+        .where(DailyTopic.category_id == cat_id)
+        .values(category_id=None, change_version=versions[ETAG_TOPICS])
+        .returning(DailyTopic.id)
+        .execution_options(synchronize_session=False)
+    )
     await db.delete(cat)
+    await events.publish(db, "category", deleted=[cat_id])
+    await events.publish(db, "topic", updated=unlinked.scalars().all())
     await db.commit()
 
 
 # ── Daily topics ──────────────────────────────────────────────
 
-async def list_topics(db: AsyncSession) -> list[DailyTopic]:
+@query_budget(2)
+async def list_topics(
+    db: AsyncSession,
+    is_draft: Optional[bool] = None,
+    category_id: Optional[int] = None,
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
+    original_source: Optional[str] = None,
+    limit: int = TOPICS_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+) -> tuple[list[DailyTopic], Optional[str]]:
+    # Keyset pagination on (created_at, id) desc; date ranges are [from, to)
+    stmt = select(DailyTopic).options(selectinload(DailyTopic.category))
+    if is_draft is not None:
+        stmt = stmt.where(DailyTopic.is_draft == is_draft)
+    if category_id is not None:
+        stmt = stmt.where(DailyTopic.category_id == category_id)
+    if created_from is not None:
+        stmt = stmt.where(DailyTopic.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(DailyTopic.created_at < created_to)
+    if sent_from is not None:
+        stmt = stmt.where(DailyTopic.sent_at >= sent_from)
+    if sent_to is not None:
+        stmt = stmt.where(DailyTopic.sent_at < sent_to)
+    if original_source is not None:
+        stmt = stmt.where(DailyTopic.original_source == original_source)
+    if cursor:
+        after_ts, after_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(DailyTopic.created_at, DailyTopic.id) < tuple_(after_ts, after_id))
+
+    limit = max(1, min(limit, TOPICS_PAGE_MAX))
     result = await db.execute(
-        select(DailyTopic)
-        .options(selectinload(DailyTopic.category))
-        .order_by(DailyTopic.created_at.desc())
+        stmt.order_by(DailyTopic.created_at.desc(), DailyTopic.id.desc()).limit(limit + 1)
     )
-    return result.scalars().all()
+    topics = result.scalars().all()
+    if len(topics) > limit:
+        topics = topics[:limit]
+        return topics, encode_cursor(topics[-1].created_at, topics[-1].id)
+    return topics, None
+
+
+@query_budget(1)
+async def list_archived_topics(
+    db: AsyncSession,
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
+    category_id: Optional[int] = None,
+    original_source: Optional[str] = None,
+    limit: int = TOPICS_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+) -> tuple[list[DailyTopicArchive], Optional[str]]:
+    # Keyset on (sent_at, id) desc; a sent_at range prunes monthly partitions
+    stmt = select(DailyTopicArchive)
+    if sent_from is not None:
+        stmt = stmt.where(DailyTopicArchive.sent_at >= sent_from)
+    if sent_to is not None:
+        stmt = stmt.where(DailyTopicArchive.sent_at < sent_to)
+    if category_id is not None:
+        stmt = stmt.where(DailyTopicArchive.category_id == category_id)
+    if original_source is not None:
+        stmt = stmt.where(DailyTopicArchive.original_source == original_source)
+    if cursor:
+        after_ts, after_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(DailyTopicArchive.sent_at, DailyTopicArchive.id) < tuple_(after_ts, after_id))
+
+    limit = max(1, min(limit, TOPICS_PAGE_MAX))
+    result = await db.execute(
+        stmt.order_by(DailyTopicArchive.sent_at.desc(), DailyTopicArchive.id.desc()).limit(limit + 1)
+    )
+    topics = result.scalars().all()
+    if len(topics) > limit:
+        topics = topics[:limit]
+        return topics, encode_cursor(topics[-1].sent_at, topics[-1].id)
+    return topics, None
 
 
+@query_budget(6)
 async def create_topic(data: DailyTopicCreate, db: AsyncSession) -> DailyTopic:
     if data.category_id:
         cat = await db.execute(select(TopicCategory).where(TopicCategory.id == data.category_id))
         if not cat.scalar_one_or_none():
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+    versions = await bump_version(db, ETAG_TOPICS)
     topic = DailyTopic(
         title=data.title,
+        title_norm=normalize_title(data.title),
         url=data.url,
         include_url=data.include_url,
         observation=data.observation,
         category_id=data.category_id,
         original_source=data.original_source,
         original_url=data.original_url,
+        change_version=versions[ETAG_TOPICS],
     )
     db.add(topic)
+    await db.flush()
+    await events.publish(db, "topic", created=[topic.id])
     await db.commit()
     result = await db.execute(
         select(DailyTopic).where(DailyTopic.id == topic.id).options(selectinload(DailyTopic.category))
@@ -203,6 +360,7 @@ async def create_topic(data: DailyTopicCreate, db: AsyncSession) -> DailyTopic:
     return result.scalar_one()
 
 
+@query_budget(8)
 async def update_topic(topic_id: int, data: DailyTopicUpdate, db: AsyncSession) -> DailyTopic:
     result = await db.execute(
         select(DailyTopic).where(DailyTopic.id == topic_id).options(selectinload(DailyTopic.category))
@@ -210,8 +368,11 @@ async def update_topic(topic_id: int, data: DailyTopicUpdate, db: AsyncSession)
     topic = result.scalar_one_or_none()
     if not topic:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Tema no encontrado")
+    versions = await bump_version(db, ETAG_TOPICS)
+    topic.change_version = versions[ETAG_TOPICS]
     if data.title is not None:
         topic.title = data.title
+        topic.title_norm = normalize_title(data.title)
     if data.url is not None:
         topic.url = data.url
     if data.include_url is not None:
@@ -223,6 +384,7 @@ async def update_topic(topic_id: int, data: DailyTopicUpdate, db: AsyncSession)
         if not cat.scalar_one_or_none():
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
         topic.category_id = data.category_id
+    await events.publish(db, "topic", updated=[topic_id])
     await db.commit()
     result = await db.execute(
         select(DailyTopic).where(DailyTopic.id == topic_id).options(selectinload(DailyTopic.category))
@@ -230,15 +392,145 @@ async def update_topic(topic_id: int, data: DailyTopicUpdate, db: AsyncSession)
     return result.scalar_one()
 
 
+@query_budget(4)
+async def list_topic_changes(db: AsyncSession, since: Optional[int]) -> dict:
+    """Topics written and deleted after version `since`, for delta sync.
+
+    reset=True means the client must reload the full list and sync from the
+    returned version next: no since, tombstones after since already pruned,
+    or more than CHANGES_MAX changes.
+    """
+    versions = await get_versions(db, ETAG_TOPICS, TOMBSTONES_PRUNED)
+    version = versions[ETAG_TOPICS]
+    if since is None or since < versions[TOMBSTONES_PRUNED] or since > version:
+        return {"version": version, "reset": True, "upserted": [], "deleted": []}
+    if since == version:
+        return {"version": version, "reset": False, "upserted": [], "deleted": []}
+
+    # Writers hold the counter row until commit, so every version up to
+    # `version` is already visible; later ones are left for the next call
+    result = await db.execute(
+        select(DailyTopic)
+        .where(DailyTopic.change_version > since, DailyTopic.change_version <= version)
+        .order_by(DailyTopic.change_version, DailyTopic.id)
+        .limit(CHANGES_MAX + 1)
+        .options(selectinload(DailyTopic.category))
+    )
+    upserted = result.scalars().all()
+    deleted = (await db.scalars(
+        select(DailyTopicTombstone.topic_id)
+        .where(DailyTopicTombstone.change_version > since, DailyTopicTombstone.change_version <= version)
+        .order_by(DailyTopicTombstone.change_version, DailyTopicTombstone.topic_id)
+        .limit(CHANGES_MAX + 1)
+    )).all()
+    if len(upserted) + len(deleted) > CHANGES_MAX:
+        return {"version": version, "reset": True, "upserted": [], "deleted": []}
+    return {"version": version, "reset": False, "upserted": upserted, "deleted": deleted}
+
+
+@query_budget(5)
 async def delete_topic(topic_id: int, db: AsyncSession) -> None:
     result = await db.execute(select(DailyTopic).where(DailyTopic.id == topic_id))
     topic = result.scalar_one_or_none()
     if not topic:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Tema no encontrado")
+    versions = await bump_version(db, ETAG_TOPICS)
     await db.delete(topic)
+    db.add(DailyTopicTombstone(topic_id=topic_id, change_version=versions[ETAG_TOPICS]))
+    await events.publish(db, "topic", deleted=[topic_id])
     await db.commit()
 
 
+@query_budget(8)
+async def batch_topics(data: DailyTopicBatch, db: AsyncSession) -> dict:
+    """Apply creates, updates and deletes in one transaction, all or nothing."""
+    if not (data.create or data.update or data.delete):
+        return {"created": [], "updated": [], "deleted": []}
+    category_ids = {t.category_id for t in [*data.create, *data.update] if t.category_id}
+    if category_ids:
+        found = set((await db.scalars(
+            select(TopicCategory.id).where(TopicCategory.id.in_(category_ids))
+        )).all())
+        if found != category_ids:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+    version = (await bump_version(db, ETAG_TOPICS))[ETAG_TOPICS]
+
+    updated_ids: list[int] = []
+    if data.update:
+        # One UPDATE ... FROM (VALUES ...); NULL keeps the current value, as in update_topic
+        rows = values(
+            column("id", Integer), column("title", String), column("url", String),
+            column("include_url", Boolean), column("observation", String), column("category_id", Integer),
+            column("title_norm", String),
+            name="changes",
+        ).data([
+            (u.id, u.title, u.url, u.include_url, u.observation, u.category_id,
+             normalize_title(u.title) if u.title is not None else None)
+            for u in data.update
+        ])
+        result = await db.execute(
+            update(DailyTopic)
+            .where(DailyTopic.id == rows.c.id)
+            .values(
+                # casts: a VALUES column holding only NULLs is typed as text
+                title=func.coalesce(cast(rows.c.title, String), DailyTopic.title),
+                title_norm=func.coalesce(cast(rows.c.title_norm, String), DailyTopic.title_norm),
+                url=func.coalesce(cast(rows.c.url, String), DailyTopic.url),
+                include_url=func.coalesce(cast(rows.c.include_url, Boolean), DailyTopic.include_url),
+                observation=func.coalesce(cast(rows.c.observation, String), DailyTopic.observation),
+                category_id=func.coalesce(cast(rows.c.category_id, Integer), DailyTopic.category_id),
+                change_version=version,
+            )
+            .returning(DailyTopic.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated_ids = result.scalars().all()
+        if len(updated_ids) != len({u.id for u in data.update}):
+            await db.rollback()
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Tema no encontrado")
+
+    deleted_ids: list[int] = []
+    if data.delete:
+        removed = delete(DailyTopic).where(DailyTopic.id.in_(data.delete)).returning(DailyTopic.id).cte("removed")
+        result = await db.execute(
+            insert(DailyTopicTombstone)
+            .add_cte(removed)
+            .from_select(["topic_id", "change_version"], select(removed.c.id, literal(version)))
+            .returning(DailyTopicTombstone.topic_id)
+        )
+        deleted_ids = result.scalars().all()
+        if len(deleted_ids) != len(set(data.delete)):
+            await db.rollback()
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Tema no encontrado")
+
+    created_ids: list[int] = []
+    if data.create:
+        result = await db.execute(
+            insert(DailyTopic).returning(DailyTopic.id, sort_by_parameter_order=True),
+            [
+                {**t.model_dump(), "title_norm": normalize_title(t.title), "change_version": version}
+                for t in data.create
+            ],
+        )
+        created_ids = result.scalars().all()
+
+    await events.publish(db, "topic", created=created_ids, updated=updated_ids, deleted=deleted_ids)
+    await db.commit()
+
+    result = await db.execute(
+        select(DailyTopic)
+        .where(DailyTopic.id.in_([*created_ids, *updated_ids]))
+        .options(selectinload(DailyTopic.category))
+    )
+    by_id = {t.id: t for t in result.scalars().all()}
+    return {
+        "created": [by_id[i] for i in created_ids],
+        # an id both updated and deleted in the same batch is gone
+        "updated": [by_id[i] for i in updated_ids if i in by_id],
+        "deleted": deleted_ids,
+    }
+
+
 # ── Email ──────────────────────────────────────────────
 
 async def send_topics_email(
@@ -247,89 +539,268 @@ async def send_topics_email(
     html_body: str,
     db: AsyncSession,
     sender_email: str = "",
-    sender_smtp_password: str = "",
     sender_id: Optional[int] = None,
-) -> None:
-    from app.core.config import settings
-
+    topic_ids: Optional[list[int]] = None,
+) -> EmailOutbox:
+    """Record the email and queue it for delivery by the outbox worker."""
     if not settings.SMTP_HOST:
         raise HTTPException(
             status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="SMTP no configurado en el servidor. Añade SMTP_HOST al .env del VPS.",
         )
 
-    # Build SMTP auth user: derive username from sender email + configured domain
-    # e.g. pespinosa@prensaiberica.es + renr.grupoepi.es → pespinosa@renr.grupoepi.es
-    if sender_email and settings.SMTP_AUTH_DOMAIN:
-        username_prefix = sender_email.split("@")[0]
-        auth_user = f"{username_prefix}@{settings.SMTP_AUTH_DOMAIN}"
-    else:
-        auth_user = settings.SMTP_USER
-
-    auth_password = sender_smtp_password or settings.SMTP_PASSWORD
-    display_from = sender_email if sender_email else (settings.SMTP_FROM or auth_user)
-
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = display_from
-    msg["To"] = ", ".join(recipients)
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-    host, port = settings.SMTP_HOST, settings.SMTP_PORT
-
-    def _send() -> None:
-        with smtplib.SMTP(host, port, timeout=15) as smtp:
-            smtp.ehlo()
-            smtp.starttls()
-            smtp.ehlo()
-            if auth_user:
-                smtp.login(auth_user, auth_password)
-            smtp.sendmail(display_from, recipients, msg.as_bytes())
-
-    try:
-        await asyncio.get_event_loop().run_in_executor(None, _send)
-    except smtplib.SMTPException as exc:
-        raise HTTPException(status.HTTP_502_BAD_GATEWAY, detail=f"Error SMTP: {exc}")
+    # Clients that do not send topic_ids get the drafts as they are now
+    if topic_ids is None:
+        topic_ids = (await db.scalars(select(DailyTopic.id).where(DailyTopic.is_draft == True))).all()
 
     import json
 
-    # Mark all draft topics as sent
+    # Mark exactly the included topics as sent (keeping the first sent_at)
     now = datetime.datetime.now(datetime.timezone.utc)
-    result = await db.execute(select(DailyTopic).where(DailyTopic.is_draft == True))
-    draft_topics = result.scalars().all()
-    topic_count = len(draft_topics)
-    for topic in draft_topics:
-        topic.is_draft = False
-        topic.sent_at = now
+    versions = await bump_version(db, ETAG_TOPICS)
+    result = await db.execute(
+        update(DailyTopic)
+        .where(DailyTopic.id.in_(topic_ids))
+        .values(
+            is_draft=False,
+            sent_at=func.coalesce(DailyTopic.sent_at, now),
+            change_version=versions[ETAG_TOPICS],
+        )
+        .returning(DailyTopic.id)
+        .execution_options(synchronize_session=False)
+    )
+    sent_ids = result.scalars().all()
 
     # Save email log
+    html_body_z, body_dictionary_id = await body_store.encode_body(db, html_body)
     log = EmailLog(
         sent_at=now,
         sender_id=sender_id,
         sender_email=sender_email,
         recipients=json.dumps(recipients),
         subject=subject,
-        html_body=html_body,
-        topic_count=topic_count,
+        html_body_z=html_body_z,
+        body_dictionary_id=body_dictionary_id,
+        search_vector=search.email_search_vector(subject, html_body),
+        topic_count=len(sent_ids),
     )
     db.add(log)
+    await db.flush()
+    if sent_ids:
+        await db.execute(
+            insert(EmailLogTopic),
+            [{"email_log_id": log.id, "daily_topic_id": topic_id} for topic_id in sent_ids],
+        )
+    job = EmailOutbox(email_log_id=log.id)
+    db.add(job)
+    await events.publish(db, "topic", updated=sent_ids)
+    await db.commit()
+    return job
+
+
+async def restore_unsent_drafts(db: AsyncSession, email_log_id: int, sent_at: datetime.datetime) -> list[int]:
+    """Return to the drafts the topics a failed email marked as sent.
+
+    Only topics whose sent_at is this email's are touched, and none that
+    another email not yet failed also includes: those were (or may still be)
+    sent. The caller commits.
+    """
+    other = aliased(EmailLogTopic)
+    in_other_email = (
+        select(other.daily_topic_id)
+        .join(EmailOutbox, EmailOutbox.email_log_id == other.email_log_id)
+        .where(
+            other.daily_topic_id == DailyTopic.id,
+            other.email_log_id != email_log_id,
+            EmailOutbox.status != "failed",
+        )
+    )
+    included = select(EmailLogTopic.daily_topic_id).where(EmailLogTopic.email_log_id == email_log_id)
+    versions = await bump_version(db, ETAG_TOPICS)
+    result = await db.execute(
+        update(DailyTopic)
+        .where(DailyTopic.id.in_(included), DailyTopic.sent_at == sent_at, ~exists(in_other_email))
+        .values(is_draft=True, sent_at=None, change_version=versions[ETAG_TOPICS])
+        .returning(DailyTopic.id)
+        .execution_options(synchronize_session=False)
+    )
+    restored = result.scalars().all()
+    await events.publish(db, "topic", updated=restored)
+    return restored
+
+
+async def _topics_for_newsletter(db: AsyncSession, *criteria) -> list[DailyTopic]:
+    # Same order as GET /added, which the editor screen shows
+    result = await db.execute(
+        select(DailyTopic)
+        .where(*criteria)
+        .options(selectinload(DailyTopic.category))
+        .order_by(DailyTopic.created_at.desc(), DailyTopic.id.desc())
+    )
+    return result.scalars().all()
+
+
+@query_budget(3)
+async def preview_newsletter(
+    db: AsyncSession, subject: str, topic_ids: list[int], message_html: Optional[str] = None,
+) -> str:
+    """The newsletter send_newsletter would render for the same topic_ids."""
+    versions = await get_versions(db, ETAG_TOPICS, ETAG_CATEGORIES)
+    ids = tuple(sorted(set(topic_ids)))
+    key = (ids, versions[ETAG_TOPICS], versions[ETAG_CATEGORIES], newsletter.template_version())
+    table = newsletter.cached_table(key)
+    if table is None:
+        table = newsletter.render_table(await _topics_for_newsletter(db, DailyTopic.id.in_(ids)))
+        newsletter.store_table(key, table)
+    return newsletter.render_newsletter(subject, message_html, table)
+
+
+async def send_newsletter(
+    recipients: list[str],
+    subject: str,
+    topic_ids: list[int],
+    db: AsyncSession,
+    message_html: Optional[str] = None,
+    sender_email: str = "",
+    sender_id: Optional[int] = None,
+) -> EmailOutbox:
+    """Render the newsletter for topic_ids on the server and queue it."""
+    topics = await _topics_for_newsletter(db, DailyTopic.id.in_(topic_ids))
+    html_body = newsletter.render_newsletter(subject, message_html, newsletter.render_table(topics))
+    return await send_topics_email(
+        recipients, subject, html_body, db,
+        sender_email=sender_email, sender_id=sender_id, topic_ids=topic_ids,
+    )
+
+
+async def get_outbox_job(db: AsyncSession, job_id: int) -> Optional[EmailOutbox]:
+    return await db.get(EmailOutbox, job_id)
+
+
+async def retry_outbox_job(db: AsyncSession, job_id: int) -> EmailOutbox:
+    job = await db.get(EmailOutbox, job_id)
+    if not job:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Envío no encontrado")
+    if job.status != "failed":
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Solo se pueden reintentar envíos fallidos")
+    job.status = "pending"
+    job.attempts = 0
+    job.next_attempt_at = datetime.datetime.now(datetime.timezone.utc)
+    # The failure put its topics back in the drafts; mark them sent again
+    versions = await bump_version(db, ETAG_TOPICS)
+    log_sent_at = select(EmailLog.sent_at).where(EmailLog.id == job.email_log_id).scalar_subquery()
+    result = await db.execute(
+        update(DailyTopic)
+        .where(
+            DailyTopic.id.in_(
+                select(EmailLogTopic.daily_topic_id).where(EmailLogTopic.email_log_id == job.email_log_id)
+            ),
+            DailyTopic.is_draft == True,
+        )
+        .values(
+            is_draft=False,
+            sent_at=func.coalesce(DailyTopic.sent_at, log_sent_at),
+            change_version=versions[ETAG_TOPICS],
+        )
+        .returning(DailyTopic.id)
+        .execution_options(synchronize_session=False)
+    )
+    await events.publish(db, "topic", updated=result.scalars().all())
     await db.commit()
+    return job
 
 
-async def list_email_logs(db: AsyncSession) -> list[EmailLog]:
+@query_budget(1)
+async def list_email_logs(
+    db: AsyncSession,
+    limit: int = EMAIL_LOGS_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+) -> tuple[list[EmailLog], Optional[str]]:
+    # html_body is never needed for the listing; raiseload guards against it
+    stmt = select(EmailLog).options(
+        defer(EmailLog.html_body, raiseload=True), defer(EmailLog.html_body_z, raiseload=True),
+        joinedload(EmailLog.outbox),
+    )
+    if cursor:
+        after_ts, after_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(EmailLog.sent_at, EmailLog.id) < tuple_(after_ts, after_id))
+    limit = max(1, min(limit, EMAIL_LOGS_PAGE_MAX))
     result = await db.execute(
-        select(EmailLog).order_by(EmailLog.sent_at.desc()).limit(200)
+        stmt.order_by(EmailLog.sent_at.desc(), EmailLog.id.desc()).limit(limit + 1)
+    )
+    logs = result.scalars().all()
+    if len(logs) > limit:
+        logs = logs[:limit]
+        return logs, encode_cursor(logs[-1].sent_at, logs[-1].id)
+    return logs, None
+
+
+@query_budget(2)
+async def email_log_stats(
+    db: AsyncSession,
+    group_by: Optional[str] = None,
+    sent_from: Optional[datetime.datetime] = None,
+    sent_to: Optional[datetime.datetime] = None,
+) -> dict:
+    filters = []
+    if sent_from is not None:
+        filters.append(EmailLog.sent_at >= sent_from)
+    if sent_to is not None:
+        filters.append(EmailLog.sent_at < sent_to)
+
+    totals = (await db.execute(
+        select(func.count(EmailLog.id), func.coalesce(func.sum(EmailLog.topic_count), 0)).where(*filters)
+    )).one()
+    groups = []
+    if group_by is not None:
+        if group_by == "day":
+            # The editors' day, not the session's (UTC). Rendered inline so the
+            # SELECT and GROUP BY expressions are identical.
+            tz = literal(settings.TOPICS_TIMEZONE, literal_execute=True)
+            key = func.date(func.timezone(tz, EmailLog.sent_at))
+        else:
+            key = EmailLog.sender_email
+        result = await db.execute(
+            select(key.label("key"), func.count(EmailLog.id), func.coalesce(func.sum(EmailLog.topic_count), 0))
+            .where(*filters)
+            .group_by(key)
+            .order_by(key.desc())
+        )
+        groups = [{"key": str(k), "emails": n, "topics": t} for k, n, t in result.all()]
+    return {"emails": totals[0], "topics": totals[1], "groups": groups}
+
+
+@query_budget(1)
+async def list_topic_emails(db: AsyncSession, topic_id: int) -> list[EmailLog]:
+    result = await db.execute(
+        select(EmailLog)
+        .join(EmailLogTopic, EmailLogTopic.email_log_id == EmailLog.id)
+        .where(EmailLogTopic.daily_topic_id == topic_id)
+        .options(
+            defer(EmailLog.html_body, raiseload=True), defer(EmailLog.html_body_z, raiseload=True),
+            joinedload(EmailLog.outbox),
+        )
+        .order_by(EmailLog.sent_at.desc())
     )
     return result.scalars().all()
 
 
-async def get_email_log(db: AsyncSession, log_id: int) -> Optional[EmailLog]:
-    result = await db.execute(select(EmailLog).where(EmailLog.id == log_id))
-    return result.scalar_one_or_none()
+async def get_email_log(db: AsyncSession, log_id: int) -> Optional[tuple[EmailLog, str]]:
+    result = await db.execute(
+        select(EmailLog).where(EmailLog.id == log_id).options(joinedload(EmailLog.outbox))
+    )
+    log = result.scalar_one_or_none()
+    if not log:
+        return None
+    return log, await body_store.decode_body(db, log)
 
 
 async def delete_email_log(db: AsyncSession, log_id: int) -> None:
-    result = await db.execute(select(EmailLog).where(EmailLog.id == log_id))
+    result = await db.execute(
+        select(EmailLog)
+        .where(EmailLog.id == log_id)
+        .options(defer(EmailLog.html_body), defer(EmailLog.html_body_z))
+    )
     log = result.scalar_one_or_none()
     if not log:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Registro no encontrado")
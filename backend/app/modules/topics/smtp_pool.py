@@ -0,0 +1,198 @@
+import asyncio
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.config import settings
+
+# Errors meaning the pooled session is gone. They are only treated as stale
+# when raised by the RSET probe, before the mail transaction starts: once
+# the server may have accepted DATA, a retry could deliver the email twice.
+_STALE_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class _StaleSession(Exception):
+    pass
+
+
+@dataclass
+class _Connection:
+    smtp: smtplib.SMTP
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class SmtpConnectionPool:
+    """Authenticated SMTP sessions kept alive per (host, port, auth user).
+
+    smtplib is blocking, so every network call runs on a small dedicated
+    thread pool. Idle sessions get a NOOP every SMTP_POOL_KEEPALIVE_SECONDS
+    and are closed after SMTP_POOL_IDLE_SECONDS without use.
+    """
+
+    def __init__(
+        self, max_idle_per_key: int, idle_seconds: float, keepalive_seconds: float, timeout: float,
+    ):
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_seconds = idle_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout = timeout
+        self._idle: dict[tuple, list[_Connection]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="smtp")
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self.in_use = 0
+        self.opened = 0
+        self.reused = 0
+        self.stale_retries = 0
+        self.evicted = 0
+        self.handshake_seconds = 0.0
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _open(self, host: str, port: int, user: str, password: str) -> smtplib.SMTP:
+        start = time.perf_counter()
+        smtp = smtplib.SMTP(host, port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if settings.SMTP_STARTTLS:
+                smtp.starttls()
+                smtp.ehlo()
+            if user:
+                smtp.login(user, password)
+        except Exception:
+            _close(smtp)
+            raise
+        self.opened += 1
+        self.handshake_seconds += time.perf_counter() - start
+        return smtp
+
+    async def _acquire(self, key: tuple) -> tuple[_Connection, bool]:
+        idle = self._idle.get(key)
+        while idle:
+            conn = idle.pop()
+            if time.monotonic() - conn.last_used > self.idle_seconds:
+                await self._run(_close, conn.smtp)
+                self.evicted += 1
+                continue
+            self.reused += 1
+            return conn, True
+        host, port, user, password = key
+        return _Connection(await self._run(self._open, host, port, user, password)), False
+
+    def _release(self, key: tuple, conn: _Connection) -> None:
+        conn.last_used = time.monotonic()
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_idle_per_key:
+            idle.append(conn)
+        else:
+            self._executor.submit(_close, conn.smtp)
+
+    async def send(
+        self, host: str, port: int, user: str, password: str,
+        from_addr: str, recipients: list[str], message: bytes,
+    ) -> None:
+        self._ensure_keepalive()
+        key = (host, port, user, password)
+        self.in_use += 1
+        try:
+            while True:
+                conn, pooled = await self._acquire(key)
+                try:
+                    # Only a pooled session can have gone stale; a fresh one
+                    # is not probed.
+                    await self._run(_send, conn.smtp, pooled, from_addr, recipients, message)
+                except _StaleSession:
+                    await self._run(_close, conn.smtp)
+                    self.stale_retries += 1
+                    continue
+                except (smtplib.SMTPException, OSError):
+                    # The session may be mid-transaction; the outbox retries
+                    # the job with backoff
+                    await self._run(_close, conn.smtp)
+                    raise
+                self._release(key, conn)
+                return
+        finally:
+            self.in_use -= 1
+
+    def _ensure_keepalive(self) -> None:
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.get_running_loop().create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_seconds)
+            for key in list(self._idle):
+                # Take the sessions out while pinging so a concurrent send
+                # never picks one up mid-NOOP.
+                idle = self._idle.pop(key)
+                alive = []
+                for conn in idle:
+                    expired = time.monotonic() - conn.last_used > self.idle_seconds
+                    if expired or not await self._run(_noop, conn.smtp):
+                        await self._run(_close, conn.smtp)
+                        self.evicted += 1
+                    else:
+                        alive.append(conn)
+                pooled = alive + self._idle.pop(key, [])
+                surplus = pooled[:-self.max_idle_per_key] if len(pooled) > self.max_idle_per_key else []
+                if pooled:
+                    self._idle[key] = pooled[len(surplus):]
+                for conn in surplus:
+                    await self._run(_close, conn.smtp)
+                    self.evicted += 1
+
+    async def close(self) -> None:
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        for idle in self._idle.values():
+            for conn in idle:
+                await self._run(_close, conn.smtp)
+        self._idle.clear()
+
+    def stats(self) -> dict:
+        return {
+            "idle": sum(len(v) for v in self._idle.values()),
+            "in_use": self.in_use,
+            "opened": self.opened,
+            "reused": self.reused,
+            "stale_retries": self.stale_retries,
+            "evicted": self.evicted,
+            "avg_handshake_ms": round(self.handshake_seconds / self.opened * 1000, 1) if self.opened else 0.0,
+        }
+
+
+def _send(smtp: smtplib.SMTP, probe: bool, from_addr: str, recipients: list[str], message: bytes) -> None:
+    if probe:
+        try:
+            code = smtp.rset()[0]
+        except _STALE_ERRORS as exc:
+            raise _StaleSession() from exc
+        if code != 250:
+            raise _StaleSession()
+    smtp.sendmail(from_addr, recipients, message)
+
+
+def _noop(smtp: smtplib.SMTP) -> bool:
+    try:
+        return smtp.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def _close(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+smtp_pool = SmtpConnectionPool(
+    max_idle_per_key=settings.SMTP_POOL_MAX_IDLE,
+    idle_seconds=settings.SMTP_POOL_IDLE_SECONDS,
+    keepalive_seconds=settings.SMTP_POOL_KEEPALIVE_SECONDS,
+    timeout=settings.SMTP_TIMEOUT_SECONDS,
+)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_db, get_current_user, require_role
+from app.core.etag import conditional_list
 from app.modules.users import schemas, service
 
 router = APIRouter()
@@ -17,10 +18,13 @@ async def list_users(
 
 @router.get("/roles", response_model=list[schemas.RoleOut])
 async def list_roles(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     _=Depends(require_role("admin")),
 ):
-    return await service.list_roles(db)
+    return await conditional_list(
+        request, db, service.ETAG_ROLES, service.list_roles, schemas.RoleOut
+    )
 
 
 @router.post("/", response_model=schemas.UserListItem, status_code=status.HTTP_201_CREATED)
@@ -3,11 +3,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+from app.core.query_budget import query_budget
 from app.modules.auth.models import User, Role
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password_async, verify_password_async
+from app.core.epochs import epoch_table
+from app.core.user_cache import user_cache
 from app.modules.users.schemas import UserCreate, UserUpdate, SetSmtpPasswordRequest, UpdateProfileRequest
 
+# change-counter group behind the ETag of GET /roles (roles only change via seed)
+ETAG_ROLES = "roles"
 
+
+@query_budget(2)
 async def list_users(db: AsyncSession) -> list[User]:
     result = await db.execute(
         select(User).options(selectinload(User.role)).order_by(User.id)
@@ -15,6 +22,7 @@ async def list_users(db: AsyncSession) -> list[User]:
     return result.scalars().all()
 
 
+@query_budget(1)
 async def list_roles(db: AsyncSession) -> list[Role]:
     result = await db.execute(select(Role).order_by(Role.id))
     return result.scalars().all()
@@ -31,7 +39,7 @@ async def create_user(data: UserCreate, db: AsyncSession) -> User:
 
     user = User(
         email=data.email,
-        hashed_password=hash_password(data.password),
+        hashed_password=await hash_password_async(data.password),
         role_id=data.role_id,
         is_active=data.is_active,
     )
@@ -59,7 +67,7 @@ async def update_user(user_id: int, data: UserUpdate, current_user_id: int, db:
         user.email = data.email
 
     if data.password is not None and data.password != "":
-        user.hashed_password = hash_password(data.password)
+        user.hashed_password = await hash_password_async(data.password)
 
     if data.role_id is not None:
         if user_id == current_user_id:
@@ -67,14 +75,23 @@ async def update_user(user_id: int, data: UserUpdate, current_user_id: int, db:
         role = await db.execute(select(Role).where(Role.id == data.role_id))
         if not role.scalar_one_or_none():
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Rol no encontrado")
+        if data.role_id != user.role_id:
+            user.security_epoch += 1
         user.role_id = data.role_id
 
     if data.is_active is not None:
         if user_id == current_user_id:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="No puedes desactivarte a ti mismo")
+        if data.is_active != user.is_active:
+            user.security_epoch += 1
         user.is_active = data.is_active
 
     await db.commit()
+    user_cache.invalidate(user_id)
+    if user.is_active:
+        epoch_table.set(user_id, user.security_epoch)
+    else:
+        epoch_table.discard(user_id)
 
     result = await db.execute(
         select(User).where(User.id == user_id).options(selectinload(User.role))
@@ -91,6 +108,7 @@ async def set_smtp_password(user_id: int, data: SetSmtpPasswordRequest, db: Asyn
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
     user.smtp_password = data.smtp_password
     await db.commit()
+    user_cache.invalidate(user_id)
     await db.refresh(user)
     return user
 
@@ -111,14 +129,15 @@ async def update_my_profile(user_id: int, data: UpdateProfileRequest, db: AsyncS
     if data.new_password:
         if not data.current_password:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Se requiere la contraseña actual")
-        if not verify_password(data.current_password, user.hashed_password):
+        if not await verify_password_async(data.current_password, user.hashed_password):
             raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Contraseña actual incorrecta")
-        user.hashed_password = hash_password(data.new_password)
+        user.hashed_password = await hash_password_async(data.new_password)
     if data.clear_smtp_password:
         user.smtp_password = None
     elif data.smtp_password is not None:
         user.smtp_password = data.smtp_password
     await db.commit()
+    user_cache.invalidate(user_id)
     result = await db.execute(
         select(User).where(User.id == user_id).options(selectinload(User.role))
     )
@@ -136,3 +155,5 @@ async def delete_user(user_id: int, current_user_id: int, db: AsyncSession) -> N
 
     await db.delete(user)
     await db.commit()
+    user_cache.invalidate(user_id)
+    epoch_table.discard(user_id)
@@ -0,0 +1,15 @@
+import uvicorn
+from app.core.config import settings
+
+
+def main() -> None:
+    uvicorn.run(
+        "app.main:app",
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        workers=settings.WEB_CONCURRENCY,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Hot-topics feed fetch benchmark against a local stand-in for the static host.
+
+Serves synthetic last_screenshot.json / competitors.json on localhost with
+ETag and Last-Modified (gzip when asked), then compares what the topics page
+did on every open (full download + parse) with the ingester's conditional
+requests, which get a 304 while the feed is unchanged:
+
+    python -m bench.feeds --sites 40 --topics 30 --rounds 20
+    python -m bench.feeds --serve            # only run the stand-in, for the ingester
+
+With --serve, point the ingester at it:
+    HOT_TOPICS_FEED_URL=http://127.0.0.1:8765/last_screenshot.json
+    COMPETITORS_FEED_URL=http://127.0.0.1:8765/competitors.json
+"""
+import argparse
+import email.utils
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.modules.topics.feeds import fetch_feed, parse_competitors, parse_hot_topics
+from bench.login_load import _percentile
+
+
+def build_feeds(sites: int, topics: int, seed: int = 1) -> dict[str, bytes]:
+    rng = random.Random(seed)
+    names = [f"site{i}" for i in range(sites)]
+    screenshot = [
+        {
+            "site": name,
+            "topics": [
+                {
+                    "hot_topic": f"Tema {j} de {name} " + "palabra " * rng.randint(3, 12),
+                    "url": f"https://www.{name}.es/noticias/{j}-{rng.randint(0, 10**9)}.html",
+                    "permanence": rng.randint(1, 48),
+                }
+                for j in range(topics)
+            ],
+        }
+        for name in names
+    ]
+    competitors = {name: rng.sample(names, k=min(5, sites)) for name in names}
+    return {
+        "/last_screenshot.json": json.dumps(screenshot).encode(),
+        "/competitors.json": json.dumps(competitors).encode(),
+    }
+
+
+class StandInHost:
+    def __init__(self, files: dict[str, bytes], port: int = 0):
+        self.files = files
+        self.modified = email.utils.formatdate(time.time(), usegmt=True)
+        self.full = 0
+        self.not_modified = 0
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = host.files.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag or (
+                    self.headers.get("If-None-Match") is None
+                    and self.headers.get("If-Modified-Since") == host.modified
+                ):
+                    host.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                host.full += 1
+                if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    body = gzip.compress(body)
+                    self.send_response(200)
+                    self.send_header("Content-Encoding", "gzip")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", host.modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sites", type=int, default=40)
+    parser.add_argument("--topics", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    files = build_feeds(args.sites, args.topics)
+    host = StandInHost(files, port=args.port if args.serve else 0)
+    if args.serve:
+        print(f"Sirviendo {host.url}/last_screenshot.json y {host.url}/competitors.json")
+        host.server.serve_forever()
+        return
+    host.start()
+    url = host.url + "/last_screenshot.json"
+
+    def full():
+        rows = parse_hot_topics(fetch_feed(url, None, None, 10).body)
+        assert len(rows) == args.sites * args.topics
+
+    first = fetch_feed(url, None, None, 10)
+    parse_competitors(fetch_feed(host.url + "/competitors.json", None, None, 10).body)
+
+    def conditional():
+        assert fetch_feed(url, first.etag, first.last_modified, 10).status == 304
+
+    full_ms = [_timed(full) for _ in range(args.rounds)]
+    cond_ms = [_timed(conditional) for _ in range(args.rounds)]
+    host.stop()
+
+    size = len(files["/last_screenshot.json"])
+    print(f"feed: {args.sites} sitios x {args.topics} temas, {size / 1024:.0f} KiB sin comprimir")
+    for label, samples in (("descarga completa + parseo", full_ms), ("petición condicional (304)", cond_ms)):
+        samples.sort()
+        print(f"{label:28} p50 {_percentile(samples, 50):7.2f} ms   p95 {_percentile(samples, 95):7.2f} ms")
+    print(f"respuestas completas {host.full}, 304 {host.not_modified}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Synthetic dataset generator.
+
+Fills the database pointed to by DATABASE_URL with roughly a year of data.
+Meant for a local benchmark database, never production:
+
+    python -m bench.generate --days 365 --topics 300000 --email-logs 20000 \
+        --domains 3000 --sport-events 250 --truncate
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import time
+
+from sqlalchemy import delete, insert, select, text
+
+from app.core.database import AsyncSessionLocal, engine
+from app.core.seed import seed_all
+from app.modules.auth.models import User
+from app.modules.domains.models import Category, Domain
+from app.modules.sports.models import SportEvent
+from app.modules.topics.models import DailyTopic, EmailLog, TopicCategory
+
+CHUNK = 5000
+
+WORDS = (
+    "gobierno elecciones tiempo lluvia calor puente festivo liga champions madrid barcelona "
+    "sevilla valencia precio luz gasolina hipoteca euríbor pensiones subida bajada huelga "
+    "metro tren aeropuerto vuelos turismo playa incendio tormenta dana alerta aemet lotería "
+    "sorteo navidad rebajas black friday vivienda alquiler ayudas bono paro empleo sanidad"
+).split()
+SOURCES = ["diariodemallorca", "levante-emv", "laprovincia", "lne", "farodevigo", "epe", "sport", None]
+SPORTS = ["Fútbol", "Baloncesto", "Tenis", "Motor", "Ciclismo", "Balonmano"]
+COLORS = ["#E06000", "#C00000", "#003C71", "#1F5C99", "#7030A0", "#375623", "#1F4E79"]
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 11))).capitalize()[:200]
+
+
+def _email_html(rng: random.Random, categories: list[str], topics_per_cat: int) -> str:
+    # Mirrors the table layout built by frontend-s3/js/topics-email.js
+    parts = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8"></head>'
+        '<body style="margin:0;padding:0;font-family:Arial,Helvetica,sans-serif;background:#f4f4f4">'
+        '<table width="100%" cellpadding="0" cellspacing="0" style="background:#f4f4f4"><tr><td align="center">'
+        '<table width="700" cellpadding="0" cellspacing="0" style="background:#ffffff;border:1px solid #dddddd">'
+    ]
+    for cat in categories:
+        color = rng.choice(COLORS)
+        parts.append(
+            f'<tr><td style="background:{color};color:#ffffff;font-weight:bold;font-size:13px;'
+            f'padding:6px 12px;text-transform:uppercase">{cat}</td></tr>'
+        )
+        for _ in range(rng.randint(1, topics_per_cat)):
+            title = _title(rng)
+            parts.append(
+                '<tr><td style="padding:6px 12px;border-bottom:1px solid #eeeeee;font-size:13px;color:#222222">'
+                f'<a href="https://www.example.es/{title.lower().replace(" ", "-")}" '
+                f'style="color:#003C71;text-decoration:none">{title}</a>'
+                f'<div style="font-size:11px;color:#777777;margin-top:2px">{_title(rng)}</div></td></tr>'
+            )
+    parts.append("</table></td></tr></table></body></html>")
+    return "".join(parts)
+
+
+async def _insert_chunks(table, rows_iter, total: int, label: str) -> None:
+    start = time.perf_counter()
+    batch = []
+    done = 0
+    async with engine.begin() as conn:
+        for row in rows_iter:
+            batch.append(row)
+            if len(batch) >= CHUNK:
+                await conn.execute(insert(table), batch)
+                done += len(batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(table), batch)
+            done += len(batch)
+    print(f"{label}: {done}/{total} rows in {time.perf_counter() - start:.1f}s")
+
+
+async def generate(args) -> None:
+    rng = random.Random(args.seed)
+    async with AsyncSessionLocal() as db:
+        await seed_all(db)
+        if args.truncate:
+            for model in (DailyTopic, EmailLog, Domain, SportEvent):
+                await db.execute(delete(model))
+            await db.commit()
+        topic_cats = (await db.execute(select(TopicCategory.id, TopicCategory.name))).all()
+        domain_cat_ids = (await db.scalars(select(Category.id))).all()
+        sender = (await db.execute(select(User.id, User.email).limit(1))).first()
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cat_ids = [c.id for c in topic_cats]
+    cat_names = [c.name for c in topic_cats]
+
+    def topics():
+        per_day = max(1, args.topics // args.days)
+        for i in range(args.topics):
+            day = min(i // per_day, args.days - 1)
+            created = now - datetime.timedelta(days=args.days - 1 - day, minutes=rng.randint(0, 600))
+            is_draft = day == args.days - 1
+            source = rng.choice(SOURCES)
+            yield {
+                "title": _title(rng),
+                "url": f"https://www.example.es/n/{i}" if rng.random() < 0.6 else None,
+                "include_url": rng.random() < 0.3,
+                "observation": _title(rng) if rng.random() < 0.2 else None,
+                "category_id": rng.choice(cat_ids) if rng.random() < 0.95 else None,
+                "original_source": source,
+                "original_url": f"https://www.{source}.es/n/{i}" if source else None,
+                "created_at": created,
+                "is_draft": is_draft,
+                "sent_at": None if is_draft else created + datetime.timedelta(hours=2),
+            }
+
+    def email_logs():
+        for i in range(args.email_logs):
+            sent_at = now - datetime.timedelta(minutes=int(i * args.days * 1440 / max(args.email_logs, 1)))
+            yield {
+                "sent_at": sent_at,
+                "sender_id": sender.id if sender else None,
+                "sender_email": sender.email if sender else "bench@example.com",
+                "recipients": json.dumps(["contenidos.seo@prensaiberica.es", "seo@prensaiberica.es"]),
+                "subject": f"Temas del día {sent_at:%d/%m/%Y}",
+                "html_body": _email_html(rng, cat_names, args.topics_per_category),
+                "topic_count": rng.randint(20, 60),
+            }
+
+    def domains():
+        for i in range(args.domains):
+            name = f"medio{i}"
+            yield {
+                "name": name.capitalize(),
+                "full_url": f"https://www.{name}.es",
+                "domain": f"{name}.es",
+                "category_id": rng.choice(domain_cat_ids),
+            }
+
+    def sport_events():
+        for i in range(args.sport_events):
+            yield {
+                "day_name": "Lunes",
+                "event_date": f"{now:%d/%m/%Y}",
+                "deporte": rng.choice(SPORTS),
+                "hora": f"{rng.randint(8, 23):02d}:{rng.choice(['00', '15', '30', '45'])}",
+                "competicion": _title(rng)[:200],
+                "evento": _title(rng),
+                "canal": rng.choice(["DAZN", "Movistar+", "La 1", None]),
+            }
+
+    await _insert_chunks(DailyTopic, topics(), args.topics, "daily_topics")
+    await _insert_chunks(EmailLog, email_logs(), args.email_logs, "email_logs")
+    await _insert_chunks(Domain, domains(), args.domains, "domains")
+    await _insert_chunks(SportEvent, sport_events(), args.sport_events, "sport_events")
+
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE"))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--topics", type=int, default=300_000)
+    parser.add_argument("--email-logs", type=int, default=20_000)
+    parser.add_argument("--topics-per-category", type=int, default=6)
+    parser.add_argument("--domains", type=int, default=3_000)
+    parser.add_argument("--sport-events", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="delete existing topics, logs, domains and events")
+    asyncio.run(generate(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
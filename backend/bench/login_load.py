@@ -0,0 +1,107 @@
+"""Login-throughput benchmark.
+
+Measures the latency of an unrelated endpoint while bcrypt logins are in
+flight, against a running API:
+
+    python -m bench.login_load --base-url http://localhost:8000 \
+        --email admin@example.com --password secret --logins 8 --duration 15
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def _request(url: str, body: dict | None = None, headers: dict | None = None) -> float:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json", **(headers or {})})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as res:
+            res.read()
+    except urllib.error.HTTPError as exc:
+        exc.read()
+    return time.perf_counter() - start
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _summary(samples: list[float]) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {
+        "count": len(ms),
+        "p50_ms": round(_percentile(ms, 50), 2),
+        "p99_ms": round(_percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+    }
+
+
+def _probe(url: str, headers: dict, stop: threading.Event, out: list[float], interval: float) -> None:
+    while not stop.is_set():
+        out.append(_request(url, headers=headers))
+        time.sleep(interval)
+
+
+def _login_loop(url: str, email: str, password: str, stop: threading.Event, out: list[float]) -> None:
+    while not stop.is_set():
+        out.append(_request(url, body={"email": email, "password": password}))
+
+
+def run_phase(args, logins: int) -> dict:
+    stop = threading.Event()
+    probe_samples: list[float] = []
+    login_samples: list[float] = []
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    threads = [threading.Thread(
+        target=_probe,
+        args=(args.base_url + args.probe_path, headers, stop, probe_samples, args.probe_interval),
+    )]
+    threads += [
+        threading.Thread(
+            target=_login_loop,
+            args=(args.base_url + "/api/auth/login", args.email, args.password, stop, login_samples),
+        )
+        for _ in range(logins)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {
+        "concurrent_logins": logins,
+        "logins_per_second": round(len(login_samples) / args.duration, 2),
+        "login": _summary(login_samples),
+        "probe": _summary(probe_samples),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login loops")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per phase")
+    parser.add_argument("--probe-path", default="/api/health")
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    parser.add_argument("--token", default="", help="bearer token for authenticated probe paths")
+    args = parser.parse_args()
+
+    report = {"idle": run_phase(args, 0), "under_login_load": run_phase(args, args.logins)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
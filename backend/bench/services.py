@@ -0,0 +1,166 @@
+"""Service-level and HTTP benchmark suite.
+
+Run against a database filled by bench.generate. Each case records latency
+percentiles and peak Python memory (tracemalloc) and is compared against
+bench/baseline.json:
+
+    python -m bench.services                      # compare against the baseline
+    python -m bench.services --save-baseline      # record a new baseline
+    python -m bench.services --base-url http://localhost:8000 --token <jwt>   # add HTTP cases
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal, engine
+from app.modules.domains import service as domains_service
+from app.modules.sports import service as sports_service
+from app.modules.sports.models import SportEvent
+from app.modules.sports.schemas import SportEventIn
+from app.modules.topics import service as topics_service
+from bench.login_load import _percentile
+
+BASELINE_PATH = pathlib.Path(__file__).with_name("baseline.json")
+
+HTTP_CASES = [
+    "/api/topics/added",
+    "/api/topics/email-logs",
+    "/api/topics/categories",
+    "/api/domains/",
+    "/api/sports/events",
+]
+
+
+async def _sport_batch() -> list[SportEventIn]:
+    async with AsyncSessionLocal() as db:
+        events = (await db.scalars(select(SportEvent))).all()
+    return [
+        SportEventIn(
+            dia=e.day_name, fecha=e.event_date, deporte=e.deporte, hora=e.hora,
+            competicion=e.competicion, evento=e.evento, canal=e.canal,
+        )
+        for e in events
+    ]
+
+
+def service_cases(sport_batch: list[SportEventIn]) -> dict:
+    return {
+        "topics.list_topics": lambda db: topics_service.list_topics(db),
+        "topics.list_topics(drafts)": lambda db: topics_service.list_topics(db, is_draft=True),
+        "topics.list_email_logs": lambda db: topics_service.list_email_logs(db),
+        "topics.list_categories": lambda db: topics_service.list_categories(db),
+        "domains.list_domains": lambda db: domains_service.list_domains(db),
+        "sports.replace_events": lambda db: sports_service.replace_events(sport_batch, db),
+    }
+
+
+def _summary(samples: list[float], peak_bytes: int) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {
+        "p50_ms": round(_percentile(ms, 50), 2),
+        "p95_ms": round(_percentile(ms, 95), 2),
+        "max_ms": round(max(ms), 2),
+        "peak_mem_kb": round(peak_bytes / 1024, 1),
+    }
+
+
+async def bench_service(fn, iterations: int, warmup: int) -> dict:
+    samples = []
+    peak = 0
+    for i in range(warmup + iterations):
+        async with AsyncSessionLocal() as db:
+            tracemalloc.start()
+            start = time.perf_counter()
+            await fn(db)
+            elapsed = time.perf_counter() - start
+            peak = max(peak, tracemalloc.get_traced_memory()[1]) if i >= warmup else peak
+            tracemalloc.stop()
+        if i >= warmup:
+            samples.append(elapsed)
+    return _summary(samples, peak)
+
+
+def bench_http(url: str, token: str, iterations: int, warmup: int) -> dict:
+    samples = []
+    size = 0
+    for i in range(warmup + iterations):
+        req = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+        start = time.perf_counter()
+        with urllib.request.urlopen(req, timeout=60) as res:
+            size = len(res.read())
+        if i >= warmup:
+            samples.append(time.perf_counter() - start)
+    result = _summary(samples, 0)
+    del result["peak_mem_kb"]
+    result["response_kb"] = round(size / 1024, 1)
+    return result
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "peak_mem_kb", "response_kb"):
+            if metric in current and previous.get(metric):
+                ratio = current[metric] / previous[metric]
+                current[f"{metric}_vs_baseline"] = round(ratio, 2)
+                if ratio > threshold:
+                    regressions.append(f"{name} {metric}: {previous[metric]} -> {current[metric]} (x{ratio:.2f})")
+    return regressions
+
+
+async def run(args) -> dict:
+    results = {}
+    cases = service_cases(await _sport_batch())
+    for name, fn in cases.items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = await bench_service(fn, args.iterations, args.warmup)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+    await engine.dispose()
+    if args.base_url:
+        for path in HTTP_CASES:
+            name = f"GET {path}"
+            if args.only and args.only not in name:
+                continue
+            results[name] = bench_http(args.base_url + path, args.token, args.iterations, args.warmup)
+            print(f"{name}: {results[name]}", file=sys.stderr)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", default="", help="run only cases whose name contains this text")
+    parser.add_argument("--base-url", default="", help="also benchmark HTTP endpoints of a running API")
+    parser.add_argument("--token", default="")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed ratio vs baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    regressions = compare(results, baseline, args.threshold)
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
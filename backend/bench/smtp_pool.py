@@ -0,0 +1,121 @@
+"""SMTP connection pool benchmark against a local stand-in server.
+
+Starts a minimal SMTP responder on localhost that sleeps --latency-ms before
+each reply (simulating the round trip to the real relay) and sends the same
+message repeatedly, once opening a connection per send like the old code did
+and once through the pool:
+
+    python -m bench.smtp_pool --sends 50 --latency-ms 20
+    python -m bench.smtp_pool --drop-after 5     # server closes sessions, exercises stale retries
+
+No TLS: the stand-in does not offer STARTTLS, so SMTP_STARTTLS is turned off
+for the run.
+"""
+import argparse
+import asyncio
+import smtplib
+import time
+
+from app.core.config import settings
+from app.modules.topics.smtp_pool import SmtpConnectionPool
+from bench.login_load import _percentile
+
+MESSAGE = b"Subject: bench\r\nFrom: bench@example.com\r\nTo: seo@example.com\r\n\r\n" + b"x" * 20_000
+
+
+class StandInServer:
+    def __init__(self, latency: float, drop_after: int):
+        self.latency = latency
+        self.drop_after = drop_after
+        self.sessions = 0
+        self.messages = 0
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        await asyncio.sleep(self.latency)
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.sessions += 1
+        delivered = 0
+        await self._reply(writer, "220 stand-in ESMTP")
+        try:
+            while line := await reader.readline():
+                command = line.decode().strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    await self._reply(writer, "250-stand-in\r\n250 AUTH PLAIN LOGIN")
+                elif command.startswith("AUTH PLAIN"):
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif command == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) != b".\r\n":
+                        pass
+                    delivered += 1
+                    self.messages += 1
+                    await self._reply(writer, "250 2.0.0 OK")
+                    if self.drop_after and delivered >= self.drop_after:
+                        break
+                elif command == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                else:  # MAIL, RCPT, NOOP, RSET
+                    await self._reply(writer, "250 OK")
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+def _send_fresh(port: int, timeout: float) -> None:
+    with smtplib.SMTP("127.0.0.1", port, timeout=timeout) as smtp:
+        smtp.ehlo()
+        smtp.login("bench@example.com", "secret")
+        smtp.sendmail("bench@example.com", ["seo@example.com"], MESSAGE)
+
+
+def _summary(samples: list[float]) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {"p50_ms": round(_percentile(ms, 50), 2), "p95_ms": round(_percentile(ms, 95), 2)}
+
+
+async def run(args) -> None:
+    settings.SMTP_STARTTLS = False
+    stand_in = StandInServer(args.latency_ms / 1000, args.drop_after)
+    server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    loop = asyncio.get_running_loop()
+
+    fresh = []
+    for _ in range(args.sends):
+        start = time.perf_counter()
+        await loop.run_in_executor(None, _send_fresh, port, 15)
+        fresh.append(time.perf_counter() - start)
+
+    pool = SmtpConnectionPool(max_idle_per_key=2, idle_seconds=300, keepalive_seconds=60, timeout=15)
+    pooled = []
+    for _ in range(args.sends):
+        start = time.perf_counter()
+        await pool.send(
+            "127.0.0.1", port, "bench@example.com", "secret",
+            "bench@example.com", ["seo@example.com"], MESSAGE,
+        )
+        pooled.append(time.perf_counter() - start)
+    await pool.close()
+    server.close()
+    await server.wait_closed()
+
+    print(f"connection per send: {_summary(fresh)}")
+    print(f"pooled:              {_summary(pooled)}")
+    print(f"pool stats:          {pool.stats()}")
+    print(f"stand-in:            {stand_in.sessions} sessions, {stand_in.messages} messages")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sends", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20, help="delay before each server reply")
+    parser.add_argument("--drop-after", type=int, default=0, help="server closes a session after N messages")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Worker-scaling load test.
+
+Starts `python -m app.server` locally with each WEB_CONCURRENCY value, drives
+it with client processes and reports throughput and latency per worker count.
+Needs the usual DATABASE_URL / SECRET_KEY in the environment:
+
+    python -m bench.worker_scaling --workers 1 2 4 --clients 16 --path /api/health
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from bench.login_load import _percentile
+
+
+def _client(args: tuple) -> list[float]:
+    url, headers, duration = args
+    samples: list[float] = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        req = urllib.request.Request(url, headers=headers)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as res:
+                res.read()
+        except urllib.error.URLError:
+            continue
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/api/health", timeout=2) as res:
+                if res.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become ready")
+
+
+def run(workers: int, args) -> dict:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "WEB_PORT": str(args.port), "WEB_HOST": "127.0.0.1"}
+    server = subprocess.Popen([sys.executable, "-m", "app.server"], env=env)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_ready(base_url)
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.map(_client, [(base_url + args.path, headers, args.duration)] * args.clients)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    samples = [s * 1000 for r in results for s in r]
+    return {
+        "workers": workers,
+        "requests": len(samples),
+        "requests_per_second": round(len(samples) / args.duration, 1),
+        "p50_ms": round(_percentile(samples, 50), 2),
+        "p99_ms": round(_percentile(samples, 99), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--path", default="/api/health")
+    parser.add_argument("--token", default="")
+    parser.add_argument("--port", type=int, default=8011)
+    args = parser.parse_args()
+    print(json.dumps([run(w, args) for w in args.workers], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,26 +11,6 @@ const DEFAULT_RECIPIENTS = [
 
 const DISCOVER_URL = 'https://docs.google.com/spreadsheets/d/1X_SK5OgYyxPlAIfos_YRqvHOXQERi9qrf2iTp8lm1ZM/edit?gid=1228257343#gid=1228257343';
 
-const CAT_COLORS = {
-  COMUNES:              '#E06000',
-  NACIONAL:             '#C00000',
-  MADRID:               '#003C71',
-  ANDALUCIA:            '#003C71',
-  BALEARES:             '#003C71',
-  CANARIAS:             '#003C71',
-  'CV/MURCIA':          '#003C71',
-  'ASTURIAS/GALICIA':   '#003C71',
-  'EXTREMADURA/ZAMORA': '#003C71',
-  'CATALUNA/ARAGON':    '#003C71',
-  INTERNACIONAL:        '#1F5C99',
-  ECONOMIA:             '#7030A0',
-  DEPORTES:             '#375623',
-  REVISTAS:             '#1F4E79',
-  RECURRENTES:          '#555555',
-};
-
-const DEFAULT_CAT_COLOR = '#003C71';
-
 /* ── Estado ── */
 let emailRecipients = [];
 let emailMsgInitialized = false;
@@ -145,135 +125,34 @@ function emailInsertEmoji() {
   }), 100);
 }
 
-/* ── Generación del HTML del correo ── */
-function _topicsToCols(topics) {
-  const n = topics.length <= 3 ? 1 : topics.length <= 6 ? 2 : 3;
-  const size = Math.ceil(topics.length / n);
-  const cols = [];
-  for (let i = 0; i < topics.length; i += size) cols.push(topics.slice(i, i + size));
-  return cols;
-}
-
-function generateEmailHtml() {
-  const msgEl  = document.getElementById('email-message');
-  const subjectVal = document.getElementById('email-subject').value.trim();
-
-  // Agrupar topics por categoría, ordenar por display_order
-  const grouped = {};
-  const uncategorized = [];
-  allTopics.forEach(t => {
-    if (t.category) {
-      const k = t.category.name;
-      if (!grouped[k]) grouped[k] = { topics: [], order: t.category.display_order ?? 999 };
-      grouped[k].topics.push(t);
-    } else {
-      uncategorized.push(t);
-    }
-  });
-
-  const entries = Object.entries(grouped).sort((a, b) => a[1].order - b[1].order);
-  if (uncategorized.length) entries.unshift(['RECURRENTES', { topics: uncategorized, order: 0 }]);
-
-  // Filas de la tabla
-  const rows = entries.map(([catName, catData]) => {
-    const color = CAT_COLORS[catName] || DEFAULT_CAT_COLOR;
-    const cols  = _topicsToCols(catData.topics);
-    const colW  = Math.floor(640 / cols.length);
-    const cells = cols.map(col =>
-      `<td width="${colW}" valign="top" style="padding:6px 10px;font-size:12px;font-family:Arial,sans-serif;vertical-align:top">
-        ${col.map(t => {
-          const titleHtml = t.include_url && t.url
-            ? `<a href="${escHtml(t.url)}" style="color:#1F5C99">${escHtml(t.title)}</a>`
-            : escHtml(t.title);
-          return `• ${titleHtml}`;
-        }).join('<br>')}
-      </td>`
-    ).join('');
-    return `
-      <tr>
-        <td width="140" valign="middle"
-          style="background:${color};color:#fff;font-weight:bold;font-size:12px;
-                 text-transform:uppercase;padding:8px 10px;font-family:Arial,sans-serif;
-                 vertical-align:middle">
-          ${escHtml(catName)}
-        </td>
-        <td style="padding:0">
-          <table width="100%" cellpadding="0" cellspacing="0" border="0"><tr>${cells}</tr></table>
-        </td>
-      </tr>`;
-  }).join('');
-
-  const topicsTable = `
-    <table width="780" border="1" cellpadding="0" cellspacing="0"
-      style="border-collapse:collapse;border:1px solid #ccc;width:100%">
-      ${rows}
-    </table>`;
-
-  const signature = `
-    <br>
-    <p style="font-family:Arial,sans-serif;font-size:13px;margin:0 0 4px">
-      <strong>Un saludo,</strong><br>
-      <strong>Departamento SEO</strong>
-    </p>
-    <p style="font-family:Arial,sans-serif;font-size:13px;margin:0 0 12px;color:#333">
-      Calle Santiago Ramon y Cajal, 41, planta 0, local 1,<br>
-      03203 Elche Parque Industrial, Alicante
-    </p>
-    <div style="border-left:4px solid #003C71;padding-left:12px;
-                font-size:10px;color:#666;font-family:Arial,sans-serif">
-      <p style="margin:4px 0"><strong>CONFIDENCIALIDAD Y PROTECCIÓN DE DATOS</strong></p>
-      <p style="margin:4px 0">
-        Este mensaje y, en su caso, cualquier fichero anexo al mismo, puede contener
-        información confidencial o legalmente protegida, siendo para uso exclusivo del
-        destinatario. Queda expresamente prohibida su divulgación, copia o distribución a
-        terceros sin la autorización expresa del remitente. Si ha recibido este mensaje por
-        error, se ruega lo notifique al remitente y proceda inmediatamente al borrado del
-        mensaje original y de todas sus copias. Muchas gracias por su colaboración.
-      </p>
-      <p style="margin:4px 0">
-        Los datos personales derivados de su correspondencia, incluyendo sus datos de
-        contacto, serán tratados por El Periódico de Catalunya, SLU, con finalidad exclusiva
-        de gestionar sus comunicaciones y su actividad profesional. Puede ejercitar sus
-        derechos de acceso, rectificación, supresión y portabilidad de sus datos, de
-        limitación y oposición a su tratamiento, así como a no ser objeto de decisiones
-        basadas únicamente en el tratamiento automatizado de sus datos, cuando proceda por
-        correo electrónico a
-        <a href="mailto:protecciondatos@prensaiberica.es">protecciondatos@prensaiberica.es</a>.
-      </p>
-      <p style="margin:4px 0">
-        Puede obtener información adicional en
-        <a href="https://www.prensaiberica.es/politica-de-privacidad-extendida/">
-          https://www.prensaiberica.es/politica-de-privacidad-extendida/
-        </a>
-      </p>
-    </div>`;
-
-  return `
-    <div style="max-width:820px;font-family:Arial,sans-serif">
-      <table width="100%" cellpadding="0" cellspacing="0" style="margin-bottom:18px">
-        <tr>
-          <td style="background:#003C71;color:#fff;font-size:20px;font-weight:bold;
-                     text-align:center;padding:16px 24px;border-radius:4px">
-            ${escHtml(subjectVal)}
-          </td>
-        </tr>
-      </table>
-      <div style="font-size:13px;font-family:Arial,sans-serif;margin-bottom:18px;line-height:1.6">
-        ${msgEl.innerHTML}
-      </div>
-      ${topicsTable}
-      ${signature}
-    </div>`;
-}
-
-/* ── Vista previa ── */
-function updateEmailPreview() {
-  const html = generateEmailHtml();
+/* ── Vista previa (renderizada en el servidor) ── */
+async function updateEmailPreview() {
   const wrap = document.getElementById('email-preview-wrap');
+  let html;
+  try {
+    // Mismos topic_ids que sendEmail(): la vista previa es lo que se enviará
+    const res = await fetch(`${API_BASE}/api/topics/newsletter/preview`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        subject: document.getElementById('email-subject').value.trim(),
+        message_html: document.getElementById('email-message').innerHTML,
+        topic_ids: allTopics.map(t => t.id),
+      }),
+    });
+    if (!res.ok) throw new Error('Error ' + res.status);
+    html = await res.text();
+  } catch (e) {
+    wrap.innerHTML = '<div style="padding:1rem;color:#ea4d4d;font-size:.85rem">Error al generar la vista previa</div>';
+    return;
+  }
   wrap.innerHTML = '';
   const iframe = document.createElement('iframe');
   iframe.style.cssText = 'width:100%;border:none;display:block;min-height:300px';
-  iframe.srcdoc = `<!DOCTYPE html><html><body style="margin:8px;padding:0">${html}</body></html>`;
+  iframe.srcdoc = html;
   iframe.onload = () => {
     try {
       iframe.style.height = (iframe.contentDocument.body.scrollHeight + 16) + 'px';
@@ -317,20 +196,25 @@ async function sendEmail() {
   }
   const subject = document.getElementById('email-subject').value.trim();
   if (!subject) { alert('El asunto es obligatorio.'); return; }
+  if (!allTopics.length) { alert('No hay temas que enviar.'); return; }
 
-  const htmlBody = generateEmailHtml();
   const btn = document.getElementById('btn-send-email');
   btn.disabled = true;
   btn.textContent = 'Enviando…';
 
   try {
-    const res = await fetch(`${API_BASE}/api/topics/send`, {
+    const res = await fetch(`${API_BASE}/api/topics/send/newsletter`, {
       method: 'POST',
       headers: {
         'Authorization': `Bearer ${token}`,
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ recipients: emailRecipients, subject, html_body: htmlBody }),
+      body: JSON.stringify({
+        recipients: emailRecipients,
+        subject,
+        message_html: document.getElementById('email-message').innerHTML,
+        topic_ids: allTopics.map(t => t.id),
+      }),
     });
 
     if (!res.ok) {
@@ -349,8 +233,8 @@ async function sendEmail() {
       <div style="background:var(--bg-card);border-radius:14px;padding:2.5rem 3rem;text-align:center;max-width:400px;width:90%;box-shadow:0 8px 40px rgba(0,0,0,.25)">
         <div style="font-size:2.5rem;margin-bottom:1rem">✅</div>
         <div style="font-size:1.05rem;font-weight:700;margin-bottom:.35rem;color:var(--text-primary)">Temas del día</div>
-        <div style="font-size:.85rem;color:var(--text-muted);margin-bottom:1.75rem">${date} — Correo enviado correctamente</div>
-        <button class="seo-btn seo-btn-primary" onclick="document.getElementById('email-sent-overlay').remove();fetchTopics();duplicateTopicIds.clear();">Cerrar</button>
+        <div style="font-size:.85rem;color:var(--text-muted);margin-bottom:1.75rem">${date} — Correo en cola de envío. Puedes seguir su estado en el Historial.</div>
+        <button class="seo-btn seo-btn-primary" onclick="document.getElementById('email-sent-overlay').remove();syncTopics();duplicateTopicIds.clear();">Cerrar</button>
       </div>`;
     document.body.appendChild(overlay);
   } catch (e) {